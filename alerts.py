@@ -0,0 +1,218 @@
+import collections
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from glucose_store import PERIODS
+
+SEVERE_LOW = 54
+SEVERE_HIGH = 250
+# Rising or falling faster than this many mg/dL per minute counts as fast (a CGM's double arrow)
+RATE_LIMIT = 2.0
+# Rate of change is only taken between readings at most this many minutes apart
+RATE_GAP = 30
+# Out-of-range readings in a row that raise a sustained alert
+RUN_LENGTH = 3
+# An ongoing condition is raised again after this many minutes
+REPEAT_AFTER = 60
+# Readings older than this (by the wall clock) are stored without alerts, e.g. an imported history
+MAX_AGE = timedelta(hours=24)
+BEDTIME = PERIODS.index("Bedtime")
+
+URGENT, WARNING, INFO = "urgent", "warning", "info"
+
+_MINUTE_NS = 60 * 10**9
+_EPOCH = datetime(1970, 1, 1)
+_NEVER = -(2**62)
+
+
+def _zone(value, low, high):
+    # -2 severe low, -1 below target, 0 in range, 1 above target, 2 severe high
+    if value < low:
+        return -2 if value < SEVERE_LOW else -1
+    if value > high:
+        return 2 if value > SEVERE_HIGH else 1
+    return 0
+
+
+class AlertEngine:
+    """Rule engine evaluated on every reading inserted into one user's ``GlucoseStore``.
+
+    Subscribes to the store and keeps the last reading, its zone relative to
+    the target range, the current out-of-range run and when each rule last
+    fired, so each new reading is checked in O(1):
+
+    - threshold: entering a zone below/above the target range or the severe
+      zones (below 54 / above 250), and back into range; a Bedtime low is a
+      nocturnal low. An ongoing condition is raised again after
+      ``REPEAT_AFTER`` minutes;
+    - rate of change: over ``RATE_LIMIT`` mg/dL per minute since a reading
+      at most ``RATE_GAP`` minutes before;
+    - sustained: ``RUN_LENGTH`` consecutive readings on the same side of the
+      target range.
+
+    Alerts are dicts passed to every sink, any callable; a failing sink is
+    counted in ``sink_errors`` and doesn't affect the insert. A backdated
+    reading is checked against the thresholds on its own; readings older
+    than ``MAX_AGE`` only update the state.
+    """
+
+    def __init__(self, store, target_range, sinks=(), user=""):
+        self.store = store
+        self.target_range = tuple(target_range)
+        self.sinks = list(sinks)
+        self.user = user
+        self.evaluated = 0
+        self.raised = 0
+        self.sink_errors = 0
+        self._last_ts = _NEVER
+        self._last_value = None
+        self._zone = 0
+        self._run = 0
+        self._fired = {}
+        with store.lock:
+            if len(store):
+                self._last_ts = int(store.timestamps[-1].astype("datetime64[ns]").astype(np.int64))
+                self._last_value = int(store.readings[-1])
+                self._zone = _zone(self._last_value, *self.target_range)
+            store.subscribe(self._on_insert)
+
+    def _on_insert(self, positions):
+        # Runs under the store's lock; positions are in time order
+        ts = self.store.timestamps[positions].astype("datetime64[ns]").view(np.int64)
+        values = self.store.readings[positions].tolist()
+        codes = self.store.period_codes[positions].tolist()
+        # Plain datetime arithmetic: converting datetime.now() to datetime64 costs more than the rules
+        cutoff = (datetime.now() - MAX_AGE - _EPOCH) // timedelta(microseconds=1) * 1000
+        for t, value, code in zip(ts.tolist(), values, codes):
+            if t >= cutoff:
+                self._evaluate(t, value, code)
+            elif t >= self._last_ts:
+                self._last_ts, self._last_value = t, value
+                self._zone, self._run = _zone(value, *self.target_range), 0
+
+    def _evaluate(self, t, value, code):
+        # t is in epoch nanoseconds
+        self.evaluated += 1
+        low, high = self.target_range
+        zone = _zone(value, low, high)
+        if t < self._last_ts:
+            if zone:
+                self._emit(t, value, code, *self._threshold(value, zone, code, low, high), backdated=True)
+            return
+
+        # Threshold crossings, and the same condition again once REPEAT_AFTER has passed
+        if zone and (abs(zone) > abs(self._zone) or zone * self._zone < 0 or self._due("zone", t)):
+            self._fire("zone", t, value, code, *self._threshold(value, zone, code, low, high))
+        elif not zone and self._zone:
+            self._emit(t, value, code, "back-in-range", INFO, f"Back in range at {value} mg/dL.")
+
+        # Rate of change against the previous reading
+        minutes = (t - self._last_ts) / _MINUTE_NS
+        if self._last_value is not None and 0 < minutes <= RATE_GAP:
+            rate = (value - self._last_value) / minutes
+            # Each direction has its own cooldown, so a fast rebound after a fast fall is still raised
+            rule = "rate-up" if rate > 0 else "rate-down"
+            if abs(rate) > RATE_LIMIT and self._due(rule, t):
+                kind = "rising-fast" if rate > 0 else "falling-fast"
+                self._fire(rule, t, value, code, kind, WARNING,
+                           f"{'Rising' if rate > 0 else 'Falling'} {abs(rate):.1f} mg/dL per minute "
+                           f"({self._last_value} to {value} mg/dL in {minutes:.0f} min).")
+
+        # Consecutive readings on the same side of the target range
+        side = (zone > 0) - (zone < 0)
+        if not side:
+            self._run = 0
+        elif side == (self._zone > 0) - (self._zone < 0):
+            self._run += 1
+        else:
+            self._run = 1
+        if self._run == RUN_LENGTH:
+            where = "above" if side > 0 else "below"
+            self._emit(t, value, code, f"sustained-{'high' if side > 0 else 'low'}", WARNING,
+                       f"{RUN_LENGTH} readings in a row {where} your target range (latest {value} mg/dL).")
+
+        self._last_ts, self._last_value, self._zone = t, value, zone
+
+    def _threshold(self, value, zone, code, low, high):
+        if zone == -2:
+            return ("severe-low", URGENT, f"{value} mg/dL is severely low (below {SEVERE_LOW}): take 15 g of "
+                                          f"fast-acting carbohydrate now and recheck in 15 minutes.")
+        if zone == -1 and code == BEDTIME:
+            return ("nocturnal-low", URGENT, f"Bedtime reading of {value} mg/dL is below your target range "
+                                             f"({low}-{high}): have a snack with carbohydrate before sleeping.")
+        if zone == -1:
+            return "low", WARNING, f"{value} mg/dL is below your target range ({low}-{high})."
+        if zone == 2:
+            return "severe-high", URGENT, f"{value} mg/dL is very high (above {SEVERE_HIGH})."
+        return "high", WARNING, f"{value} mg/dL is above your target range ({low}-{high})."
+
+    def _due(self, rule, t):
+        return t - self._fired.get(rule, _NEVER) >= REPEAT_AFTER * _MINUTE_NS
+
+    def _fire(self, rule, t, *alert):
+        self._fired[rule] = t
+        self._emit(t, *alert)
+
+    def _emit(self, t, value, code, kind, severity, message, backdated=False):
+        self.raised += 1
+        alert = {
+            "user": self.user,
+            "time": np.datetime64(t, "ns").astype("datetime64[us]").item(),
+            "reading": value,
+            "period": PERIODS[code],
+            "kind": kind,
+            "severity": severity,
+            "message": message + (" (earlier reading)" if backdated else ""),
+        }
+        for sink in self.sinks:
+            try:
+                sink(alert)
+            except Exception:
+                self.sink_errors += 1
+
+
+class AlertLog:
+    """Sink keeping a user's most recent alerts in memory for the UI.
+
+    Each alert gets an increasing ``id``; ``since(id)`` returns the ones
+    raised after it, e.g. by the reading a page just saved.
+    """
+
+    def __init__(self, maxlen=200):
+        self._alerts = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.sequence = 0
+
+    def __call__(self, alert):
+        with self._lock:
+            self.sequence += 1
+            self._alerts.append({**alert, "id": self.sequence})
+
+    def since(self, sequence):
+        with self._lock:
+            return [alert for alert in self._alerts if alert["id"] > sequence]
+
+    def recent(self, n=5):
+        """The newest ``n`` alerts, newest first."""
+        with self._lock:
+            return list(self._alerts)[-n:][::-1]
+
+
+class JsonlAlertSink:
+    """Sink appending every alert as a JSON line to ``path``, for other tools to follow."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, alert):
+        line = json.dumps({**alert, "time": alert["time"].isoformat()}) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
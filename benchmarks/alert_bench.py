@@ -0,0 +1,79 @@
+"""Cost of evaluating the glucose alert rules on every insert, for many CGM patients.
+
+Each patient gets an in-memory ``GlucoseStore`` holding a day of
+``workload.cgm_trace`` history, then receives ``--hours`` of live readings
+one at a time (every patient's 5-minute reading in turn, as a CGM feed
+arrives) and again as hourly uploads of 12 readings through ``extend``.
+Both runs are timed with and without an ``alerts.AlertEngine`` subscribed,
+and the engine's share is compared with the rate the patients produce
+readings at (one per patient every 5 minutes). Run from the repository root:
+
+    python -m benchmarks.alert_bench [--patients 1000 10000] [--hours 6]
+"""
+import argparse
+import collections
+import time
+
+from alerts import AlertEngine
+from benchmarks.workload import cgm_trace
+from glucose_store import PERIODS, GlucoseStore
+
+INTERVAL = 5
+TARGET_RANGE = (80, 140)
+
+
+def _patients(n, history, live, with_engine):
+    kinds = collections.Counter()
+    patients = []
+    for seed in range(n):
+        ts, values, codes = cgm_trace(history + live, INTERVAL, seed=seed)
+        store = GlucoseStore(capacity=history + live)
+        store.extend(ts[:history], values[:history], codes[:history])
+        engine = AlertEngine(store, TARGET_RANGE, [lambda alert: kinds.update([alert["kind"]])]) if with_engine else None
+        patients.append((store, engine, ts[history:], values[history:].tolist(), codes[history:].tolist()))
+    return patients, kinds
+
+
+def _live(patients, live):
+    t0 = time.perf_counter()
+    for i in range(live):
+        for store, _, ts, values, codes in patients:
+            store.add(ts[i], values[i], PERIODS[codes[i]])
+    return time.perf_counter() - t0
+
+
+def _batched(patients, live, batch):
+    t0 = time.perf_counter()
+    for i in range(0, live, batch):
+        for store, _, ts, values, codes in patients:
+            store.extend(ts[i:i + batch], values[i:i + batch], codes[i:i + batch])
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--hours", type=int, default=6)
+    args = parser.parse_args()
+    history, live = 24 * 60 // INTERVAL, args.hours * 60 // INTERVAL
+
+    print(f"{'patients':>9} {'mode':>8} {'store':>10} {'+engine':>10} {'engine':>10} {'alerts/day':>11} "
+          f"{'headroom':>9}")
+    for n in args.patients:
+        for mode, run in (("add", _live), ("batch 12", lambda p, m: _batched(p, m, 12))):
+            plain, _ = _patients(n, history, live, False)
+            base = run(plain, live) / (n * live)
+            engines, kinds = _patients(n, history, live, True)
+            kinds.clear()
+            total = run(engines, live) / (n * live)
+            raised = sum(kinds.values()) / n * 24 / args.hours
+            # Readings the patients produce per second against what one process can insert and evaluate
+            headroom = (1 / total) / (n / (INTERVAL * 60))
+            print(f"{n:>9,} {mode:>8} {base * 1e6:>8.1f}us {total * 1e6:>8.1f}us {(total - base) * 1e6:>8.1f}us "
+                  f"{raised:>11.1f} {headroom:>8,.0f}x")
+        print(f"{'':>9} alerts: " + ", ".join(f"{kind} {count / n * 24 / args.hours:.1f}"
+                                              for kind, count in kinds.most_common()) + " per patient-day")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Size and search latency of the recommendation archive as advice accumulates.
+
+Archives synthetic recommendations (about 1 KB of markdown each, shaped
+like the model's four-part answers, with varied foods and meals) and
+reports on-disk size against the raw text, the time to archive one, and the
+time to count and load one page of search results. Run from the repository
+root:
+
+    python -m benchmarks.archive_bench [--sizes 1000 10000 50000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from rec_archive import RecommendationArchive
+
+FOODS = ["oatmeal", "salmon", "lentils", "chicken", "tofu", "quinoa", "broccoli", "eggs", "yogurt", "avocado",
+         "chickpeas", "spinach", "turkey", "barley", "almonds", "berries"]
+MEALS = ["Breakfast", "Lunch", "Dinner", "Snack"]
+QUERIES = [("salmon", None), ("chick", None), ("tofu quinoa", "Dinner"), ("walk", "Breakfast"),
+           ("barley avocado", None)]
+SECTIONS = {
+    "Glucose analysis": ["Your morning readings are {level} than your target, which often follows a late dinner.",
+                         "Post-meal values rise by about {rise} mg/dL, so portion control at this meal matters.",
+                         "Your evening readings are stable and mostly within range.",
+                         "Variability between days is moderate; consistent meal timing will help."],
+    "Meal recommendations": ["Have {food} ({grams} g) with a large portion of non-starchy vegetables.",
+                             "Pair {food} with half a cup of {food2} to slow carbohydrate absorption.",
+                             "A side of {food} adds fibre and protein without a large glucose rise.",
+                             "Cook with olive oil and season with herbs rather than sugary sauces."],
+    "Foods to avoid": ["Avoid sugary drinks, fruit juice and white bread at this meal.",
+                       "Limit {food} if it is sweetened or fried.",
+                       "Skip desserts and refined snacks while readings are {level}."],
+    "Tips": ["A 15-minute walk after eating helps blunt the post-meal rise.",
+             "Drink water with the meal and check your glucose two hours afterwards.",
+             "Eat the vegetables and protein first and the starch last."],
+}
+
+
+def _advice(rng):
+    parts = []
+    for title, sentences in SECTIONS.items():
+        parts.append(f"**{title}:**")
+        for sentence in rng.sample(sentences, min(len(sentences), 3)):
+            food, food2 = rng.sample(FOODS, 2)
+            parts.append("- " + sentence.format(level=rng.choice(["higher", "lower", "slightly higher"]),
+                                                rise=rng.randint(20, 90), food=food, food2=food2,
+                                                grams=rng.choice([80, 100, 120, 150])))
+    return "\n".join(parts)
+
+
+def _ms(func, repeat=20):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e3
+
+
+def bench(n, rng):
+    path = os.path.join(tempfile.mkdtemp(prefix="gluco-archive-"), "recommendations.sqlite3")
+    archive = RecommendationArchive(path)
+    raw = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        text = _advice(rng)
+        raw += len(text.encode())
+        archive.add(text, meal_type=rng.choice(MEALS), glucose=[rng.randint(70, 250) for _ in range(3)],
+                    restrictions=rng.sample(["Vegan", "Low-Carb", "Gluten-Free"], 1), foods=", ".join(FOODS[:2]))
+    add_ms = (time.perf_counter() - t0) / n * 1e3
+    sqlite3.connect(path).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+    search = {f"{q}{' / ' + m if m else ''}": _ms(lambda: [archive.text(e['id']) for e in archive.search(q, m)]
+                                                    + [archive.count(q, m)]) for q, m in QUERIES}
+    return raw, size, add_ms, search
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for n in args.sizes:
+        raw, size, add_ms, search = bench(n, rng)
+        print(f"{n:>7,} recommendations: raw text {raw / 1e6:.1f} MB, archive {size / 1e6:.1f} MB "
+              f"(text + index), {add_ms:.2f} ms per add")
+        for query, ms in search.items():
+            print(f"{'':>10}search + first page '{query}': {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
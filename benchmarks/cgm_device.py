@@ -0,0 +1,140 @@
+"""Simulated CGM devices posting readings to the live ingest endpoint.
+
+Each device is one user: it first uploads ``--backfill`` readings of
+``workload.cgm_trace`` history in posts of up to ``ingest.MAX_POST`` (as a
+CGM app does when it reconnects), then sends one reading every
+``--interval`` seconds, a 5-minute sensor sped up. A refused post (503) is
+resent after its ``Retry-After``. Reports readings sent, refusals, post
+latency and, for a receiver it started itself, the writer's batches. Against
+the running app:
+
+    GLUCO_INGEST_PORT=8766 streamlit run mealplane.py
+    python -m benchmarks.cgm_device --url http://127.0.0.1:8766 --devices 3 --interval 5 --seconds 600
+
+Without ``--url`` the devices post to an ``ingest.IngestServer`` started over
+a temporary data directory, which is the benchmark: run from the repository
+root,
+
+    python -m benchmarks.cgm_device [--devices 200] [--interval 0.05] [--seconds 10] [--queue 20000]
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from benchmarks.workload import cgm_trace
+from data_service import DataService
+from glucose_store import PERIODS
+from ingest import MAX_POST, IngestServer
+from perf import recorder
+
+INTERVAL_MINUTES = 5
+
+
+class Device:
+    def __init__(self, url, user, backfill, seed, token=None):
+        self.url = url.rstrip("/") + "/readings"
+        self.user = user
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.backfill = backfill
+        self.seed = seed
+        self.sent = 0
+        self.refused = 0
+        self.dropped = 0
+        self.latencies = []
+
+    def post(self, ts, values, codes):
+        body = json.dumps({"user": self.user, "readings": [
+            {"time": str(t.astype("datetime64[s]")), "value": int(v), "period": PERIODS[c]}
+            for t, v, c in zip(ts, values, codes)]}).encode()
+        while True:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(self.url, body, self.headers)) as response:
+                    response.read()
+                self.latencies.append(time.perf_counter() - started)
+                self.sent += len(ts)
+                return
+            except urllib.error.HTTPError as exc:
+                if exc.code != 503:
+                    raise
+                self.refused += len(ts)
+                time.sleep(float(exc.headers.get("Retry-After", 1)))
+            except (urllib.error.URLError, ConnectionError):
+                # Receiver unreachable or overloaded at the socket level: try again shortly
+                self.dropped += 1
+                time.sleep(1)
+
+    def run(self, interval, until):
+        # Live readings are stamped from now on, at the sensor's 5-minute spacing
+        ts, values, codes = cgm_trace(self.backfill + int((until - time.monotonic()) / interval) + 1,
+                                      INTERVAL_MINUTES, seed=self.seed)
+        live_start = ts[self.backfill - 1] if self.backfill else ts[0] - np.timedelta64(INTERVAL_MINUTES, "m")
+        ts = ts - (live_start - np.datetime64("now", "ns"))
+        for i in range(0, self.backfill, MAX_POST):
+            end = min(i + MAX_POST, self.backfill)
+            self.post(ts[i:end], values[i:end], codes[i:end])
+        i = self.backfill
+        next_at = time.monotonic()
+        while i < len(ts) and time.monotonic() < until:
+            self.post(ts[i:i + 1], values[i:i + 1], codes[i:i + 1])
+            i += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="ingest endpoint of a running app; default: start one here")
+    parser.add_argument("--token")
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between a device's readings")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--backfill", type=int, default=288)
+    parser.add_argument("--queue", type=int, default=20_000, help="queue size of the receiver started here")
+    args = parser.parse_args()
+
+    server = tmp = None
+    url = args.url
+    if url is None:
+        tmp = tempfile.TemporaryDirectory()
+        server = IngestServer(DataService(tmp.name), port=0, token=args.token, capacity=args.queue).start()
+        url = "http://%s:%d" % server.address
+
+    devices = [Device(url, f"cgm-{n:04d}", args.backfill, n, args.token) for n in range(args.devices)]
+    until = time.monotonic() + args.seconds
+    started = time.perf_counter()
+    threads = [threading.Thread(target=device.run, args=(args.interval, until)) for device in devices]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    sent = sum(device.sent for device in devices)
+    latencies = sorted(t for device in devices for t in device.latencies)
+    print(f"{args.devices} devices, {elapsed:.1f}s: {sent:,} readings sent ({sent / elapsed:,.0f}/s), "
+          f"{sum(device.refused for device in devices):,} refused and resent, "
+          f"{sum(device.dropped for device in devices):,} connection errors")
+    print(f"post latency: median {statistics.median(latencies) * 1e3:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms over {len(latencies):,} posts")
+    if server is not None:
+        server.stop()
+        status, flush = server.status(), recorder.snapshot().get("ingest.flush")
+        print(f"writer: {status['written']:,} written in {status['flushes']:,} batches "
+              f"({status['written'] / max(status['flushes'], 1):,.0f} readings each), "
+              f"{status['duplicates']:,} duplicates; flush median {flush['p50'] * 1e3:.2f} ms, "
+              f"p99 {flush['p99'] * 1e3:.2f} ms")
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Bulk CSV import throughput in rows per second.
+
+Run from the repository root:
+
+    python -m benchmarks.import_bench [--sizes 100000 500000] [--chunksize 100000]
+
+Generates a CGM-style export (5-minute readings, no period column) and an
+export in the app's own format, and imports each into an empty store and
+again into the same store, where every row is a duplicate.
+"""
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+
+from glucose_store import PERIODS, GlucoseStore
+from importer import import_csv
+
+
+def cgm_csv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2023-01-01", periods=n, freq="5min")
+    glucose = np.clip(130 + 40 * np.sin(np.arange(n) / 40) + rng.normal(0, 15, n), 40, 400).round()
+    frame = pd.DataFrame({"Device Timestamp": ts.strftime("%Y-%m-%d %H:%M"), "Historic Glucose mg/dL": glucose})
+    return frame.to_csv(index=False)
+
+
+def app_csv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Timestamp": pd.date_range("2023-01-01", periods=n, freq="5min"),
+        "Reading": rng.integers(60, 250, n),
+        "Period": np.asarray(PERIODS)[rng.integers(0, len(PERIODS), n)],
+        "Notes": "",
+    })
+    return frame.to_csv(index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'rows':>10} {'fresh rows/s':>13} {'dup rows/s':>11}")
+    for n in args.sizes:
+        for name, make in (("cgm", cgm_csv), ("app", app_csv)):
+            text = make(n)
+            store = GlucoseStore()
+            fresh = import_csv(store, io.StringIO(text), chunksize=args.chunksize)
+            dup = import_csv(store, io.StringIO(text), chunksize=args.chunksize)
+            assert fresh.imported == n and dup.duplicates == n
+            print(f"{name:>8} {n:>10,} {fresh.rows_per_second:>13,.0f} {dup.rows_per_second:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
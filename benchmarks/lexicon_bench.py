@@ -0,0 +1,110 @@
+"""Lookup latency of the food lexicon at tens of thousands of food names.
+
+Builds ``food_lexicon.FoodLexicon`` over synthetic food names (cooking
+method x flavour x food, with a synonym for about one food in three) and
+times, per lookup: exact matches, completion of 2-5 letter prefixes,
+entries with one or two typos, and parsing a five-entry food list mixing
+the three. Also reports build time and the lexicon's traced memory. Run
+from the repository root:
+
+    python -m benchmarks.lexicon_bench [--sizes 10000 30000 100000] [--lookups 2000]
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+import tracemalloc
+
+from food_lexicon import FoodLexicon
+
+METHODS = ["grilled", "roasted", "baked", "steamed", "sauteed", "braised", "poached", "fried", "smoked", "raw",
+           "pickled", "stewed", "toasted", "mashed", "boiled", "seared", "stir-fried", "slow-cooked", "blackened",
+           "marinated"]
+FLAVOURS = ["garlic", "lemon", "ginger", "chili", "herb", "honey", "sesame", "coconut", "curry", "pesto", "smoky",
+            "spicy", "sweet", "tangy", "peppered", "miso", "teriyaki", "tandoori", "cajun", "balsamic", "mustard",
+            "za'atar", "harissa", "jerk", "lime", "maple", "black bean", "tomato", "cheddar", "onion"]
+FOODS = ["chicken", "salmon", "tofu", "lentils", "chickpeas", "beef", "pork", "shrimp", "cod", "tuna", "turkey",
+         "eggs", "quinoa", "brown rice", "barley", "oats", "couscous", "bulgur", "polenta", "potatoes",
+         "sweet potato", "broccoli", "cauliflower", "spinach", "kale", "zucchini", "eggplant", "mushrooms",
+         "asparagus", "green beans", "peppers", "carrots", "cabbage", "brussels sprouts", "tempeh", "paneer",
+         "noodles", "spaghetti", "tortillas", "flatbread", "black beans", "kidney beans", "edamame", "squash",
+         "pumpkin", "beets", "corn", "peas", "okra", "bok choy", "leeks", "fennel", "artichoke", "duck", "lamb",
+         "mackerel", "sardines", "trout", "scallops", "mussels", "yogurt", "cottage cheese", "ricotta"]
+
+
+def synthetic_names(n, rng):
+    names = [f"{method} {flavour} {food}" for method in METHODS for flavour in FLAVOURS for food in FOODS]
+    rng.shuffle(names)
+    while len(names) < n:
+        names += [f"{name} {variant}" for name in names[:n - len(names)] for variant in [rng.choice(
+            ["bowl", "salad", "wrap", "skewers", "bake", "soup", "stew", "platter"])]]
+    return names[:n]
+
+
+def _typo(word, rng, edits):
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        op = rng.choice("sdi")
+        letter = rng.choice(string.ascii_lowercase)
+        word = word[:i] + (letter if op != "d" else "") + word[i + (op != "i"):]
+    return word
+
+
+def _per_lookup(func, queries):
+    times = []
+    for query in queries:
+        t0 = time.perf_counter()
+        func(query)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e6, statistics.quantiles(times, n=20)[-1] * 1e6
+
+
+def bench(n, lookups, rng):
+    names = synthetic_names(n, rng)
+    entries = [(name, food_id) for food_id, name in enumerate(names, 1)]
+    # About one food in three also answers to its words in another order
+    entries += [(" ".join(reversed(name.split(" ", 1))), food_id) for food_id, name in enumerate(names, 1)
+                if food_id % 3 == 0]
+    t0 = time.perf_counter()
+    lexicon = FoodLexicon(entries)
+    build = time.perf_counter() - t0
+    # Memory of a second build, traced separately since tracing slows the build down
+    tracemalloc.start()
+    traced = FoodLexicon(entries)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    exact = [rng.choice(names).title() for _ in range(lookups)]
+    prefixes = [rng.choice(rng.choice(names).split())[:rng.randint(2, 5)] for _ in range(lookups)]
+    typos = [_typo(rng.choice(names), rng, rng.randint(1, 2)) for _ in range(lookups)]
+    lists = [", ".join([exact[i], typos[i], prefixes[i], rng.choice(FOODS), rng.choice(names)])
+             for i in range(lookups)]
+    rows = [
+        ("exact", _per_lookup(lexicon.lookup, exact)),
+        ("prefix", _per_lookup(lexicon.complete, prefixes)),
+        ("typo", _per_lookup(lexicon.fuzzy, typos)),
+        ("parse 5 entries", _per_lookup(lexicon.parse, lists)),
+    ]
+    found = sum(lexicon.fuzzy(query) is not None for query in typos[:200]) / min(200, len(typos))
+    return len(lexicon), build, memory, rows, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 30_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for n in args.sizes:
+        terms, build, memory, rows, found = bench(n, args.lookups, rng)
+        print(f"{n:>7,} foods ({terms:,} terms): built in {build:.2f}s, {memory / 1e6:.0f} MB; "
+              f"{found:.0%} of typos matched")
+        for name, (median, p95) in rows:
+            print(f"{'':>10}{name:<16} median {median:>7.1f} us   p95 {p95:>7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Time-to-first-token and total latency of Meal Planner completions.
+
+Runs against the local stub server, comparing the old blocking
+``chat.completions.create`` call with the streaming ``CompletionWorker``:
+
+    python -m benchmarks.llm_bench [--users 1 8 32] [--ttft 0.5] [--token-delay 0.02]
+
+With ``--users N`` that many requests are issued at once, one thread per
+simulated session, and the median / worst latencies are reported. Users send
+the same prompt, which the gateway coalesces into one upstream call, unless
+``--distinct`` is given; the gateway's concurrency limit and rate limiter are
+set with ``--max-concurrency`` and ``--rate``.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from benchmarks import stub_llm_server
+from llm import MODEL, CompletionWorker
+
+def _messages(user):
+    return [{"role": "user", "content": f"Breakfast ideas for a morning reading of {user} mg/dL"}]
+
+
+def blocking_call(client, messages):
+    t0 = time.perf_counter()
+    client.chat.completions.create(model=MODEL, temperature=0.3, messages=messages)
+    total = time.perf_counter() - t0
+    # Nothing is shown until the whole response arrives
+    return total, total
+
+
+def streaming_call(worker, messages):
+    t0 = time.perf_counter()
+    ttft = None
+    for _ in worker.stream(messages):
+        if ttft is None:
+            ttft = time.perf_counter() - t0
+    return ttft, time.perf_counter() - t0
+
+
+def run(call, users, distinct):
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        results = list(pool.map(lambda user: call(_messages(user if distinct else 0)), range(users)))
+    ttfts, totals = zip(*results)
+    return statistics.median(ttfts), max(ttfts), statistics.median(totals), max(totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--ttft", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--distinct", action="store_true", help="give every user a different prompt")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=1000.0, help="gateway requests per second")
+    args = parser.parse_args()
+
+    server, base_url = stub_llm_server.start(ttft=args.ttft, token_delay=args.token_delay)
+    client = OpenAI(base_url=base_url, api_key="stub")
+    worker = CompletionWorker(base_url=base_url, api_key="stub", max_concurrency=args.max_concurrency,
+                              rate=args.rate, burst=args.max_concurrency)
+    streaming_call(worker, _messages(-1))  # warm up the connection pool
+
+    print(f"{'mode':>10} {'users':>6} {'ttft p50':>9} {'ttft max':>9} {'total p50':>10} {'total max':>10} "
+          f"{'upstream':>9}")
+    for users in args.users:
+        for name, call in (("blocking", lambda m: blocking_call(client, m)),
+                           ("streaming", lambda m: streaming_call(worker, m))):
+            before = server.RequestHandlerClass.requests
+            t50, tmax, total50, totalmax = run(call, users, args.distinct)
+            upstream = server.RequestHandlerClass.requests - before
+            print(f"{name:>10} {users:>6} {t50:>8.3f}s {tmax:>8.3f}s {total50:>9.3f}s {totalmax:>9.3f}s "
+                  f"{upstream:>9}")
+    print("gateway:", worker.metrics())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
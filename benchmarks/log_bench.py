@@ -0,0 +1,54 @@
+"""Cold-open time of a persisted reading log.
+
+Run from the repository root:
+
+    python -m benchmarks.log_bench [--sizes 100000 500000 2000000]
+
+Each size is written once to a temporary directory, then reopened with
+``GlucoseStore.from_log()`` the way the app does on first render.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from glucose_store import PERIODS, GlucoseStore
+from reading_log import RECORD_DTYPE, ReadingLog
+
+
+def write_log(directory, n, seed=0):
+    rng = np.random.default_rng(seed)
+    records = np.zeros(n, dtype=RECORD_DTYPE)
+    start = np.datetime64("2020-01-01T00:00", "ns").astype(np.int64)
+    records['ts'] = start + np.arange(n, dtype=np.int64) * 300_000_000_000
+    records['reading'] = rng.integers(60, 250, n)
+    records['period'] = rng.integers(0, len(PERIODS), n)
+    log = ReadingLog(directory)
+    log.append_many(records)
+    return log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000, 2_000_000])
+    args = parser.parse_args()
+
+    print(f"{'readings':>10} {'open':>10} {'first frame':>12} {'first append':>13}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_log(tmp, n)
+            t0 = time.perf_counter()
+            store = GlucoseStore.from_log(ReadingLog(tmp))
+            open_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            store.to_frame()
+            frame_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            store.add(store.last()['Timestamp'], 120, PERIODS[0])
+            append_s = time.perf_counter() - t0
+            print(f"{n:>10,} {open_s * 1e3:>8.2f}ms {frame_s * 1e3:>10.2f}ms {append_s * 1e3:>11.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Latency of the local meal scoring in ``nutrition`` over random Meal Planner requests.
+
+Each request draws Morning/Afternoon/Evening readings, a target range, up to
+two Dietary Restrictions, a cuisine and liked foods, then ranks every
+candidate meal from the bundled food table. Reports the candidate count and
+the median / p95 time per meal type, after loading the table and its
+lexicon once. Run from the repository root:
+
+    python -m benchmarks.nutrition_bench [--requests 500]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from food_lexicon import FoodLexicon
+from nutrition import CUISINES, MEAL_TYPES, TAGS, FoodTable, plan_meals
+
+LIKED = ["", "chicken, rice", "salmon", "beans, tortillas", "tofu, noodles", "oats, berries", "pasta", "yogurt"]
+
+
+def _request(rng, lexicon):
+    low = rng.choice([70, 80, 90])
+    glucose = {period: rng.randint(55, 300) for period in ("Morning", "Afternoon", "Evening")}
+    restrictions = rng.sample(list(TAGS) + ["Low-Carb"], rng.randint(0, 2))
+    liked = {food_id for entry in lexicon.parse(rng.choice(LIKED)) for food_id in entry["ids"]}
+    return glucose, (low, low + 50), restrictions, rng.choice(["Any"] + CUISINES), liked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    t0 = time.perf_counter()
+    table = FoodTable.load()
+    lexicon = FoodLexicon.from_table(table)
+    print(f"food table: {len(table)} foods, {len(lexicon)} lexicon terms, loaded in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    print(f"{'meal':>10} {'candidates':>11} {'median':>9} {'p95':>9}")
+    for meal_type in MEAL_TYPES:
+        times, candidates = [], []
+        for _ in range(args.requests):
+            glucose, target_range, restrictions, cuisine, liked = _request(rng, lexicon)
+            t0 = time.perf_counter()
+            plan = plan_meals(table, meal_type, glucose, target_range, restrictions, cuisine, liked)
+            times.append(time.perf_counter() - t0)
+            candidates.append(plan["candidates"])
+        p95 = statistics.quantiles(times, n=20)[-1]
+        print(f"{meal_type:>10} {statistics.median(candidates):>11,.0f} {statistics.median(times) * 1e3:>7.2f}ms "
+              f"{p95 * 1e3:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
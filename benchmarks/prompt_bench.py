@@ -0,0 +1,106 @@
+"""Meal Planner prompt size and latency: pattern summary against raw readings.
+
+For synthetic histories of increasing length (5-minute readings), the user
+message is built two ways over the same last ``SUMMARY_DAYS`` days: with the
+token-budgeted pattern summary from ``glucose_patterns`` (read off the
+per-day profile and range index that the app keeps current on every insert)
+and with every reading as a ``timestamp,reading,period`` line. Reports the
+estimated prompt tokens, the time to assemble the prompt and the streamed
+first-token / total latency from the stub server, whose prefill time grows
+with the prompt (``--prompt-delay`` seconds per 1,000 tokens). Run from the
+repository root:
+
+    python -m benchmarks.prompt_bench [--days 30 365 1095] [--prompt-delay 0.2] [--repeat 3]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks import stub_llm_server
+from benchmarks.workload import synthetic_history
+from glucose_patterns import SUMMARY_DAYS, DailyProfile, estimate_tokens, format_summary, pattern_summary
+from glucose_store import PERIODS, GlucoseStore
+from llm import CompletionWorker
+from range_index import RangeIndex
+
+TARGET_RANGE = (80, 130)
+
+
+def _messages(history_text):
+    return [
+        {"role": "system", "content": "You are a knowledgeable diabetes nutritional assistant."},
+        {"role": "user", "content": f"My recent glucose readings are:\n- Morning: 120 mg/dL\n- Afternoon: 140 mg/dL\n"
+                                    f"- Evening: 135 mg/dL\n\n{history_text}\n\nI'm planning to eat for Dinner."},
+    ]
+
+
+def summary_prompt(store, profile, index):
+    patterns = pattern_summary(profile, index, TARGET_RANGE)
+    return _messages(f"Patterns in my logged history:\n{format_summary(patterns)}")
+
+
+def raw_prompt(store, profile, index):
+    start = store.timestamps[-1].astype("datetime64[D]") - np.timedelta64(SUMMARY_DAYS - 1, "D")
+    lo, hi = store.bounds(start)
+    minutes = store.timestamps[lo:hi].astype("datetime64[m]").astype(str)
+    lines = [f"{ts},{reading},{PERIODS[code]}"
+             for ts, reading, code in zip(minutes, store.readings[lo:hi], store.period_codes[lo:hi])]
+    return _messages("All my readings (timestamp,mg/dL,period):\n" + "\n".join(lines))
+
+
+def _latency(worker, messages):
+    t0 = time.perf_counter()
+    ttft = None
+    for _ in worker.stream(messages):
+        if ttft is None:
+            ttft = time.perf_counter() - t0
+    return ttft, time.perf_counter() - t0
+
+
+def bench(days, worker, repeat):
+    store = GlucoseStore()
+    store.extend(*synthetic_history(days=days, per_day=288))
+    profile, index = DailyProfile(store), RangeIndex(store)
+    rows = []
+    for name, build in (("summary", summary_prompt), ("raw readings", raw_prompt)):
+        builds, ttfts, totals = [], [], []
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            messages = build(store, profile, index)
+            builds.append(time.perf_counter() - t0)
+            # A distinct system prompt per request keeps the gateway from coalescing repeats
+            messages[0]["content"] += f" ({name} {days} {i})"
+            ttft, total = _latency(worker, messages)
+            ttfts.append(ttft)
+            totals.append(total)
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        rows.append((name, tokens, statistics.median(builds), statistics.median(ttfts), statistics.median(totals)))
+    return len(store), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 1095])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--prompt-delay", type=float, default=0.2, help="stub prefill seconds per 1,000 tokens")
+    args = parser.parse_args()
+
+    server, base_url = stub_llm_server.start(ttft=args.ttft, token_delay=args.token_delay,
+                                             prompt_delay=args.prompt_delay)
+    worker = CompletionWorker(base_url=base_url, api_key="stub")
+
+    print(f"summary covers the last {SUMMARY_DAYS} days; stub prefill {args.prompt_delay}s per 1k tokens")
+    print(f"{'history':>16} {'prompt':>13} {'tokens':>8} {'build':>9} {'ttft':>8} {'total':>8}")
+    for days in args.days:
+        readings, rows = bench(days, worker, args.repeat)
+        for name, tokens, build, ttft, total in rows:
+            print(f"{readings:>16,} {name:>13} {tokens:>8,} {build * 1e3:>7.2f}ms {ttft:>7.3f}s {total:>7.3f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Time-window query latency of RangeIndex against the old DataFrame filtering.
+
+Run from the repository root:
+
+    python -m benchmarks.query_bench [--sizes 100000 1000000 5000000] [--queries 200]
+
+Each query computes what the History tab shows for a random date range:
+count, mean, median, quartiles, standard deviation, min/max, time in range
+and per-bucket means. The baseline is the old path: copy the history
+DataFrame, filter it with a string date comparison and aggregate the copy.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from glucose_store import PERIOD_BUCKET, PERIODS, GlucoseStore
+from range_index import RangeIndex
+
+
+def _synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.datetime64("2020-01-01", "ns") + np.arange(n) * np.timedelta64(5, "m")
+    return ts, rng.integers(60, 250, n), rng.integers(0, len(PERIODS), n)
+
+
+def _ranges(ts, count, seed=1):
+    rng = np.random.default_rng(seed)
+    days = (ts[-1] - ts[0]) // np.timedelta64(1, "D")
+    starts = rng.integers(0, days, count)
+    lengths = rng.choice([7, 14, 30, 90, 365, days], count)
+    first = pd.Timestamp(ts[0]).normalize()
+    return [(first + pd.Timedelta(days=int(s)), first + pd.Timedelta(days=int(s + d))) for s, d in zip(starts, lengths)]
+
+
+def _summary(agg):
+    return (agg.count, agg.mean, agg.median, agg.quantile(0.25), agg.quantile(0.75), agg.std, agg.min, agg.max,
+            agg.in_range(80, 130), agg.bucket_means())
+
+
+def bench_index(store, ranges):
+    index = RangeIndex(store)
+    t0 = time.perf_counter()
+    index.counts()
+    build_s = time.perf_counter() - t0
+
+    times = []
+    for start, end in ranges:
+        t0 = time.perf_counter()
+        _summary(index.aggregate(start, end))
+        times.append(time.perf_counter() - t0)
+
+    # Cost of the next query after a reading is appended
+    store.add(pd.Timestamp(store.timestamps[-1]) + pd.Timedelta(minutes=5), 120, PERIODS[0])
+    t0 = time.perf_counter()
+    _summary(index.aggregate(*ranges[0]))
+    append_s = time.perf_counter() - t0
+    return build_s, np.percentile(times, 50), np.percentile(times, 95), append_s
+
+
+def bench_dataframe(store, ranges):
+    frame = store.to_frame().reset_index()
+    frame['Date'] = frame['Timestamp'].dt.strftime("%Y-%m-%d")
+    frame['Bucket'] = PERIOD_BUCKET[store.period_codes]
+    times = []
+    for start, end in ranges:
+        t0 = time.perf_counter()
+        df = frame.copy()
+        df = df[(df['Date'] >= start.strftime("%Y-%m-%d")) & (df['Date'] < end.strftime("%Y-%m-%d"))]
+        readings = df['Reading']
+        (len(readings), readings.mean(), readings.median(), readings.quantile(0.25), readings.quantile(0.75),
+         readings.std(), readings.min(), readings.max(), readings.between(80, 130).sum(),
+         df.groupby('Bucket')['Reading'].mean())
+        times.append(time.perf_counter() - t0)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--no-baseline", action="store_true", help="skip the DataFrame baseline")
+    args = parser.parse_args()
+
+    print(f"{'readings':>10} {'build':>9} {'query p50':>10} {'query p95':>10} {'after add':>10} "
+          f"{'df p50':>9} {'df p95':>9}")
+    for n in args.sizes:
+        ts, readings, periods = _synthetic(n)
+        store = GlucoseStore()
+        store.extend(ts, readings, periods)
+        ranges = _ranges(ts, args.queries)
+        build_s, p50, p95, append_s = bench_index(store, ranges)
+        line = f"{n:>10,} {build_s * 1e3:>7.1f}ms {p50 * 1e3:>8.2f}ms {p95 * 1e3:>8.2f}ms {append_s * 1e3:>8.2f}ms"
+        if not args.no_baseline:
+            df_p50, df_p95 = bench_dataframe(store, ranges[:20])
+            line += f" {df_p50 * 1e3:>7.1f}ms {df_p95 * 1e3:>7.1f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Per-interaction rerun time of the app: full-script rerun against fragment rerun.
+
+Drives ``mealplane.py`` headlessly with Streamlit's ``AppTest`` over a
+synthetic history. Each interaction's script execution time is measured
+twice: as a full script rerun, which is what every widget change cost
+before the pages became fragments, and as a rerun of only the fragment that
+owns the widget, which is what the browser requests now. Run from the repository root:
+
+    python -m benchmarks.rerun_bench [--readings 100000] [--repeat 5] [--app mealplane.py]
+
+``--app`` can point at an older copy of the script (e.g. from ``git show``)
+to compare; interactions whose widget is not inside a fragment there only
+get the full-rerun column.
+"""
+import argparse
+import contextlib
+import inspect
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+from benchmarks.workload import BENCH_USER, synthetic_history
+
+# (page, widget kind, label, two values to alternate between, fragment function owning the widget)
+INTERACTIONS = [
+    ("History", "selectbox", "Time Period", ["All Time", "Last 30 Days"], "history_page"),
+    ("History", "date_input", "Export Range", None, "history_export"),
+    ("Log Glucose", "button", "Save Reading", None, "log_glucose_page"),
+    ("Meal Planner", "selectbox", "Meal Type", ["Lunch", "Dinner"], "meal_planner_page"),
+]
+
+
+def _populate(n):
+    from data_service import DataService
+
+    DataService().user(BENCH_USER).store.extend(*synthetic_history(n, per_day=288))
+
+
+def fragment_ids(at, script_path):
+    """Map fragment function names in the app to their registered fragment ids."""
+    ids = {}
+    for fragment_id, wrapper in at._fragment_storage._fragments.items():
+        for cell in wrapper.__closure__ or ():
+            # Page functions are also wrapped by perf.timed; look through functools.wraps
+            func = inspect.unwrap(cell.cell_contents) if callable(cell.cell_contents) else cell.cell_contents
+            code = getattr(func, "__code__", None)
+            if code is not None and os.path.samefile(code.co_filename, script_path):
+                ids[func.__name__] = fragment_id
+    return ids
+
+
+_SCRIPT_CACHE = ScriptCache()
+
+
+@contextlib.contextmanager
+def timed_runs(fragment_id=None):
+    """Time script execution inside ``AppTest.run()``, optionally as a rerun of one fragment.
+
+    Yields a list that receives the seconds between the runner's start and
+    stop events of each run, which leaves out AppTest's own setup and
+    element-tree parsing. With ``fragment_id`` the run requests only that
+    fragment, like the browser does after a widget change inside it.
+    """
+    from streamlit.runtime.scriptrunner import ScriptRunnerEvent
+    from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+    from streamlit.testing.v1 import local_script_runner
+
+    runner_class = local_script_runner.LocalScriptRunner
+    original = runner_class.run
+    timings = []
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        # AppTest compiles the script afresh for every run; a server compiles it once
+        self._script_cache = _SCRIPT_CACHE
+        started = []
+
+        def on_event(sender, event, **kwargs):
+            if event == ScriptRunnerEvent.SCRIPT_STARTED:
+                started.append(time.perf_counter())
+            elif event in (ScriptRunnerEvent.SCRIPT_STOPPED_WITH_SUCCESS,
+                           ScriptRunnerEvent.FRAGMENT_STOPPED_WITH_SUCCESS,
+                           ScriptRunnerEvent.SCRIPT_STOPPED_WITH_COMPILE_ERROR):
+                timings.append(time.perf_counter() - started[-1])
+
+        self.on_event.connect(on_event, weak=False)
+        # Replace the initial full-rerun request rather than coalescing with it
+        self._requests._rerun_data = RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                               fragment_id_queue=[fragment_id] if fragment_id else [])
+        try:
+            if not self._script_thread:
+                self.start()
+            local_script_runner.require_widgets_deltas(self, timeout)
+        finally:
+            self.join()
+        return local_script_runner.parse_tree_from_messages(self.forward_msgs())
+
+    runner_class.run = run
+    try:
+        yield timings
+    finally:
+        runner_class.run = original
+
+
+def _interact(at, kind, label, values, i):
+    widget = next(w for w in getattr(at, kind) if w.label == label)
+    if kind == "button":
+        widget.click()
+    elif kind == "date_input":
+        first, last = widget.value
+        widget.set_value((first, last) if i % 2 else (first, first))
+    else:
+        widget.set_value(values[i % 2])
+
+
+def bench(script_path, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(script_path, default_timeout=300)
+    at.session_state["user_name"] = BENCH_USER
+    at.run()
+    results = []
+    for page, kind, label, values, fragment in INTERACTIONS:
+        # A fragment rerun leaves only that fragment in the element tree; rebuild it first
+        at.run().sidebar.radio[0].set_value(page).run()
+        fragment_id = fragment_ids(at, script_path).get(fragment)
+        full, partial = [], []
+        for i in range(repeat):
+            at.run()
+            _interact(at, kind, label, values, i)
+            with timed_runs() as timings:
+                at.run()
+            full.extend(timings)
+            if fragment_id is None:
+                continue
+            at.run()
+            _interact(at, kind, label, values, i + 1)
+            with timed_runs(fragment_id) as timings:
+                at.run()
+            partial.extend(timings)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        results.append((f"{page}: {label}", statistics.median(full),
+                        statistics.median(partial) if partial else None))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readings", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--app", default="mealplane.py")
+    args = parser.parse_args()
+
+    os.environ["GLUCO_DATA_DIR"] = tempfile.mkdtemp(prefix="gluco-bench-")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    _populate(args.readings)
+    results = bench(os.path.abspath(args.app), args.repeat)
+
+    print(f"{args.readings:,} readings, median of {args.repeat} reruns")
+    print(f"{'interaction':<30} {'full rerun':>11} {'fragment':>10} {'speedup':>8}")
+    for name, full, partial in results:
+        if partial is None:
+            print(f"{name:<30} {full * 1e3:>9.1f}ms {'-':>10} {'-':>8}")
+        else:
+            print(f"{name:<30} {full * 1e3:>9.1f}ms {partial * 1e3:>8.1f}ms {full / partial:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
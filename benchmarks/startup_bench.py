@@ -0,0 +1,97 @@
+"""Cold-start time of the app: time to first render in a fresh process.
+
+Every sample is a new Python process, like a newly started server worker.
+It renders ``mealplane.py`` once with Streamlit's ``AppTest`` (the first
+render, which lands on Log Glucose) and then opens one other page for the
+first time. Both are script execution times, so they include the imports
+the script does but not Streamlit's own. Heavy modules that the first render
+loaded on top of Streamlit are listed too. Run from the repository root:
+
+    python -m benchmarks.startup_bench [--repeat 5] [--readings 10000] [--app mealplane.py]
+
+``--app`` can point at an older copy of the script in the repository root
+(e.g. from ``git show``) to compare.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PAGES = ["Dashboard", "Meal Planner", "History"]
+HEAVY_MODULES = ["pandas", "plotly.graph_objects", "openai", "pyarrow"]
+
+
+def _worker(script_path, page):
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.rerun_bench import timed_runs
+    from benchmarks.workload import BENCH_USER
+
+    streamlit_ready = time.perf_counter()
+    at = AppTest.from_file(script_path, default_timeout=300)
+    at.session_state["user_name"] = BENCH_USER
+    preloaded = set(sys.modules)
+    with timed_runs() as first:
+        at.run()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules and name not in preloaded]
+    at.sidebar.radio[0].set_value(page)
+    with timed_runs() as visit:
+        at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {
+        "streamlit_import": streamlit_ready - started,
+        "first_render": first[0],
+        "page_visit": visit[0],
+        "loaded": loaded,
+    }
+
+
+def bench(script_path, repeat, data_dir):
+    env = {**os.environ, "GLUCO_DATA_DIR": data_dir}
+    samples = {page: [] for page in PAGES}
+    for _ in range(repeat):
+        for page in PAGES:
+            out = subprocess.run([sys.executable, "-m", "benchmarks.startup_bench", "--worker", script_path, page],
+                                 env=env, capture_output=True, text=True)
+            if out.returncode:
+                raise RuntimeError(f"worker failed on {page}:\n{out.stderr[-4000:]}")
+            samples[page].append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--readings", type=int, default=10_000)
+    parser.add_argument("--app", default="mealplane.py")
+    parser.add_argument("--worker", nargs=2, metavar=("SCRIPT", "PAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(*args.worker)))
+        return
+
+    from benchmarks.suite import prepare
+
+    data_dir = tempfile.mkdtemp(prefix="gluco-startup-")
+    prepare(data_dir, args.readings)
+    samples = bench(os.path.abspath(args.app), args.repeat, data_dir)
+
+    runs = [s for page in PAGES for s in samples[page]]
+    print(f"{args.app}, {args.readings:,} readings, median of {len(runs)} fresh processes")
+    print(f"{'import streamlit':<28} {statistics.median(s['streamlit_import'] for s in runs) * 1e3:>8.1f}ms")
+    print(f"{'first render (Log Glucose)':<28} {statistics.median(s['first_render'] for s in runs) * 1e3:>8.1f}ms")
+    for page in PAGES:
+        visit = statistics.median(s['page_visit'] for s in samples[page])
+        print(f"{'first visit: ' + page:<28} {visit * 1e3:>8.1f}ms")
+    print(f"{'loaded by first render':<28} {', '.join(runs[0]['loaded']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Append and read latency of GlucoseStore at increasing history sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.store_bench [--sizes 10000 100000 1000000] [--concat]
+
+``--concat`` also times the old per-save ``pd.concat`` path, which is
+quadratic and therefore only run for the smallest size.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from glucose_store import PERIODS, GlucoseStore
+
+
+def _synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01T00:00", "m")
+    ts = start + np.arange(n) * np.timedelta64(5, "m")
+    readings = rng.integers(60, 250, n)
+    periods = rng.integers(0, len(PERIODS), n)
+    return ts, readings, periods
+
+
+def bench_store(n):
+    ts, readings, periods = _synthetic(n)
+    store = GlucoseStore()
+    t0 = time.perf_counter()
+    for i in range(n):
+        store.add(ts[i], int(readings[i]), PERIODS[periods[i]])
+    append_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    store.to_frame()
+    frame_s = time.perf_counter() - t0
+
+    reps = 1000
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        store.last()
+        store.bounds(ts[n // 2], ts[-1])
+        store.readings.mean()
+    read_s = (time.perf_counter() - t0) / reps
+    return append_s / n, frame_s, read_s
+
+
+def bench_concat(n):
+    ts, readings, periods = _synthetic(n)
+    df = pd.DataFrame(columns=['Date', 'Time', 'Reading', 'Period'])
+    t0 = time.perf_counter()
+    for i in range(n):
+        stamp = pd.Timestamp(ts[i])
+        entry = {'Date': stamp.strftime("%Y-%m-%d"), 'Time': stamp.strftime("%H:%M"),
+                 'Reading': int(readings[i]), 'Period': PERIODS[periods[i]], 'Notes': ""}
+        df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--concat", action="store_true", help="also time the pd.concat baseline")
+    args = parser.parse_args()
+
+    print(f"{'readings':>10} {'append/row':>12} {'to_frame':>10} {'last+window+mean':>17}")
+    for n in args.sizes:
+        append_s, frame_s, read_s = bench_store(n)
+        print(f"{n:>10,} {append_s * 1e6:>10.2f}us {frame_s * 1e3:>8.2f}ms {read_s * 1e6:>15.2f}us")
+    if args.concat:
+        n = min(args.sizes)
+        print(f"pd.concat baseline at {n:,} readings: {bench_concat(n) * 1e6:.2f}us per append")
+
+
+if __name__ == "__main__":
+    main()
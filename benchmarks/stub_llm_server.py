@@ -0,0 +1,116 @@
+"""Local OpenAI-compatible chat completions server for offline runs.
+
+Answers ``POST /v1/chat/completions`` with a canned recommendation, either
+as one JSON body or as a server-sent event stream, after a configurable
+time-to-first-token and per-token delay. ``prompt_delay`` adds prefill time
+per 1,000 prompt tokens (estimated at four characters per token), so longer
+prompts answer later as they do on a real server. Point the app at it with:
+
+    python -m benchmarks.stub_llm_server --port 8765 &
+    NEBIUS_BASE_URL=http://127.0.0.1:8765/v1/ NEBIUS_API_KEY=stub streamlit run mealplane.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "**Glucose analysis:** your readings are close to target. "
+    "**Suggested meal:** grilled chicken (120 g), half a cup of brown rice and a large portion of "
+    "non-starchy vegetables. **Avoid:** sugary drinks and white bread. "
+    "**Tip:** a 15-minute walk after eating helps blunt the post-meal rise."
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    ttft = 0.5
+    token_delay = 0.02
+    prompt_delay = 0.0
+    reply = REPLY
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        type(self).requests += 1
+        model = body.get("model", "stub")
+        words = self.reply.split(" ")
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+        time.sleep(self.ttft + self.prompt_delay * prompt_tokens / 1000)
+
+        if not body.get("stream"):
+            time.sleep(self.token_delay * len(words))
+            self._send_json({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self.reply}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words)},
+            })
+            return
+
+        try:
+            self._stream(words, model)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the request
+            pass
+
+    def _stream(self, words, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "finish_reason": None,
+                                                  "delta": {"content": " " + word if i else word}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        done = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": model, "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}
+        self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start(port=0, ttft=0.5, token_delay=0.02, prompt_delay=0.0):
+    """Start the stub in a daemon thread and return ``(server, base_url)``."""
+    handler = type("Handler", (StubHandler,), {"ttft": ttft, "token_delay": token_delay,
+                                               "prompt_delay": prompt_delay})
+    # The default listen backlog of 5 drops simultaneous connects from concurrent benchmark users
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 256})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="extra seconds per 1,000 prompt tokens")
+    args = parser.parse_args()
+    server, base_url = start(args.port, args.ttft, args.token_delay, args.prompt_delay)
+    print(f"Stub chat completions server on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""End-to-end benchmark suite: app rerun latency and peak memory by history size.
+
+For each size a synthetic history (see ``benchmarks.workload``) is written to
+a fresh data directory and a separate worker process drives ``mealplane.py``
+headlessly with Streamlit's ``AppTest``, against the local stub LLM server.
+Timings are script execution time of the run that handles the interaction
+(see ``benchmarks.rerun_bench``); memory is the worker's peak RSS. Run from
+the repository root:
+
+    python -m benchmarks.suite [--sizes 1000 10000 100000 1000000] [--repeat 5] [--per-day 288]
+                               [--save benchmarks/results/NAME.json] [--compare benchmarks/results/BASE.json]
+
+``--save`` stores the results with the environment they were measured in;
+``--compare`` prints the change against a saved run and exits with status 1
+when a metric got worse by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Reported metrics in table order; timings are milliseconds
+METRICS = [
+    "cold_start_ms",
+    "dashboard_ms",
+    "history_cold_ms",
+    "history_rerun_ms",
+    "history_period_ms",
+    "meal_planner_miss_ms",
+    "meal_planner_hit_ms",
+    "meal_planner_local_ms",
+    "save_reading_ms",
+    "peak_rss_mb",
+]
+
+
+def prepare(directory, readings, per_day=288, seed=0):
+    """Write a synthetic history of ``readings`` readings for ``BENCH_USER`` under ``directory``."""
+    from benchmarks.workload import BENCH_USER, synthetic_history
+    from reading_log import ReadingLog, user_key
+
+    ts, values, codes, notes = synthetic_history(readings, per_day=per_day, seed=seed)
+    ReadingLog(os.path.join(directory, user_key(BENCH_USER))).extend(ts, values, codes, notes)
+
+
+def _worker(repeat):
+    """Run the scenarios in this process and return the metrics."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks import stub_llm_server
+    from benchmarks.rerun_bench import fragment_ids, timed_runs
+    from benchmarks.workload import BENCH_USER
+
+    _server, os.environ["NEBIUS_BASE_URL"] = stub_llm_server.start(ttft=0.0, token_delay=0.0)
+    os.environ["NEBIUS_API_KEY"] = "stub"
+    script = os.path.abspath("mealplane.py")
+
+    def widget(kind, label):
+        return next(w for w in getattr(at, kind) if w.label == label)
+
+    def timed(fragment=None, times=1, before=None):
+        samples = []
+        for i in range(times):
+            at.run()
+            if before:
+                before(i)
+            fragment_id = fragment_ids(at, script)[fragment] if fragment else None
+            with timed_runs(fragment_id) as timings:
+                at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            samples.extend(timings)
+        return statistics.median(samples) * 1e3
+
+    metrics = {}
+    at = AppTest.from_file(script, default_timeout=900)
+    at.session_state["user_name"] = BENCH_USER
+    with timed_runs() as timings:
+        at.run()
+    metrics["cold_start_ms"] = timings[0] * 1e3
+
+    at.sidebar.radio[0].set_value("Dashboard").run()
+    metrics["dashboard_ms"] = timed(times=repeat)
+
+    # History with every cache dropped: reopen the log, rebuild stats and index, build the figures
+    at.sidebar.radio[0].set_value("History").run()
+    metrics["history_cold_ms"] = timed(times=repeat, before=lambda i: (st.cache_data.clear(),
+                                                                      st.cache_resource.clear()))
+    widget("selectbox", "Time Period").set_value("All Time").run()
+    metrics["history_rerun_ms"] = timed(times=repeat)
+    metrics["history_period_ms"] = timed(
+        "history_page", repeat,
+        lambda i: widget("selectbox", "Time Period").set_value(["Last 30 Days", "All Time"][i % 2]))
+
+    at.run().sidebar.radio[0].set_value("Meal Planner").run()
+    restrictions = widget("multiselect", "Dietary Restrictions").options
+
+    def new_request(i):
+        # A restriction not asked for before makes a new prompt, so the request misses the cache
+        widget("multiselect", "Dietary Restrictions").set_value([restrictions[i % len(restrictions)]])
+        widget("button", "Get Recommendations").click()
+
+    metrics["meal_planner_miss_ms"] = timed("meal_planner_page", min(repeat, len(restrictions)), new_request)
+    metrics["meal_planner_hit_ms"] = timed("meal_planner_page", repeat, lambda i: widget(
+        "button", "Get Recommendations").click())
+    # Meal suggestions from the local food table alone, without the LLM explanation
+    widget("checkbox", "Explain with AI").uncheck()
+    metrics["meal_planner_local_ms"] = timed("meal_planner_page", repeat, lambda i: widget(
+        "button", "Get Recommendations").click())
+
+    at.run().sidebar.radio[0].set_value("Log Glucose").run()
+    metrics["save_reading_ms"] = timed("log_glucose_page", repeat, lambda i: widget("button", "Save Reading").click())
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    metrics["peak_rss_mb"] = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return metrics
+
+
+def _environment():
+    import numpy
+    import pandas
+    import plotly
+    import streamlit
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "plotly": plotly.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def run_suite(sizes, repeat, per_day, seed=0):
+    results = {}
+    for n in sizes:
+        directory = tempfile.mkdtemp(prefix="gluco-suite-")
+        prepare(directory, n, per_day, seed)
+        env = {**os.environ, "GLUCO_DATA_DIR": directory}
+        out = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--worker", "--repeat", str(repeat)],
+                             env=env, capture_output=True, text=True)
+        if out.returncode:
+            raise RuntimeError(f"worker failed at {n:,} readings:\n{out.stderr[-4000:]}")
+        results[str(n)] = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{n:>10,} readings: " + ", ".join(f"{k} {v:.1f}" for k, v in results[str(n)].items()), flush=True)
+    return results
+
+
+def print_table(results):
+    sizes = list(results)
+    print(f"{'metric':<22}" + "".join(f"{int(n):>12,}" for n in sizes))
+    for metric in METRICS:
+        print(f"{metric:<22}" + "".join(f"{results[n][metric]:>12.1f}" for n in sizes))
+
+
+def compare(results, baseline, tolerance):
+    """Print new/baseline ratios and return the metrics that regressed beyond ``tolerance``."""
+    regressions = []
+    sizes = [n for n in results if n in baseline]
+    print(f"{'change vs baseline':<22}" + "".join(f"{int(n):>12,}" for n in sizes))
+    for metric in METRICS:
+        cells = []
+        for n in sizes:
+            new, old = results[n].get(metric), baseline[n].get(metric)
+            if new is None or not old:
+                cells.append(f"{'-':>12}")
+                continue
+            ratio = new / old
+            flag = "!" if ratio > 1 + tolerance else " "
+            if flag == "!":
+                regressions.append((metric, n, old, new))
+            cells.append(f"{(ratio - 1) * 100:>+10.0f}%{flag}")
+        print(f"{metric:<22}" + "".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=288, help="readings per day (288 = 5-minute CGM)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging, 0.25 = 25%%")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args.repeat)))
+        return
+
+    results = run_suite(args.sizes, args.repeat, args.per_day, args.seed)
+    print()
+    print_table(results)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"environment": _environment(), "repeat": args.repeat, "per_day": args.per_day,
+                       "seed": args.seed, "results": results}, f, indent=2)
+        print(f"\nSaved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
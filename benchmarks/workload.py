@@ -0,0 +1,88 @@
+"""Synthetic patient histories for benchmarks.
+
+Readings are spread over ``days`` days ending now, ``per_day`` per day on
+average. Each reading gets a Log Glucose period drawn from
+``PERIOD_WEIGHTS`` and a time inside that period's hours, and a value
+around the period's typical level (higher after meals) plus a slow
+day-to-day drift and Gaussian noise, clipped to the valid reading range.
+"""
+import math
+
+import numpy as np
+
+from glucose_store import MAX_READING, MIN_READING, PERIODS, infer_period
+
+# Share of readings per Log Glucose period, in PERIODS order
+PERIOD_WEIGHTS = [0.16, 0.12, 0.16, 0.12, 0.16, 0.12, 0.10, 0.06]
+# Hours of the day each period's readings fall in, in PERIODS order
+PERIOD_HOURS = [(6, 8), (8, 10), (11, 13), (13, 15), (17, 19), (19, 21), (21, 24), (0, 24)]
+# Typical level (mg/dL) per period: fasting/pre-meal lower, post-meal higher
+PERIOD_LEVEL = [110, 165, 115, 160, 120, 170, 135, 125]
+# Profile the benchmarks write their synthetic history under and open in the app
+BENCH_USER = "Benchmark"
+NOTES = ["walked 30 min", "pizza", "stressful day", "felt shaky", "late snack", "missed dose"]
+
+
+def synthetic_history(readings=None, days=None, per_day=24, noise=18.0, period_weights=None, notes_rate=0.02,
+                      end=None, seed=0):
+    """Return ``(timestamps, readings, period_codes, notes)`` sorted by time.
+
+    Give either the number of ``readings`` (the span in days follows from
+    ``per_day``) or ``days``.
+    """
+    rng = np.random.default_rng(seed)
+    if readings is None:
+        readings = int(days * per_day)
+    days = days or max(1, math.ceil(readings / per_day))
+    weights = np.asarray(period_weights or PERIOD_WEIGHTS, dtype=np.float64)
+    end = np.datetime64("now", "s") if end is None else np.datetime64(end, "s")
+    start = (end - np.timedelta64(days, "D")).astype("datetime64[D]")
+
+    codes = rng.choice(len(PERIODS), readings, p=weights / weights.sum()).astype(np.int8)
+    day = rng.integers(0, days, readings)
+    hours = np.asarray(PERIOD_HOURS, dtype=np.float64)[codes]
+    seconds = day * 86400 + (hours[:, 0] + rng.random(readings) * (hours[:, 1] - hours[:, 0])) * 3600
+    ts = start.astype("datetime64[ns]") + (seconds * 1e9).astype("timedelta64[ns]")
+
+    drift = np.cumsum(rng.normal(0, 2.0, days))[day]
+    values = np.asarray(PERIOD_LEVEL, dtype=np.float64)[codes] + drift + rng.normal(0, noise, readings)
+    values = np.clip(np.round(values), MIN_READING, MAX_READING).astype(np.int16)
+
+    notes = np.full(readings, "", dtype=object)
+    with_notes = rng.random(readings) < notes_rate
+    notes[with_notes] = rng.choice(NOTES, int(with_notes.sum()))
+
+    order = np.argsort(ts, kind="stable")
+    return ts[order], values[order], codes[order], notes[order]
+
+
+# Meal times (hour of day) and the shape of the glucose rise after each, for CGM traces
+MEAL_HOURS = [7.0, 12.5, 18.5]
+MEAL_PEAK_HOURS = 0.75
+
+
+def cgm_trace(readings, interval=5, end=None, seed=0):
+    """Return ``(timestamps, readings, period_codes)`` of a CGM sampling every ``interval`` minutes up to ``end``.
+
+    The trace is a fasting level with a rise after each meal (random size
+    per meal, peaking ``MEAL_PEAK_HOURS`` after it), an occasional overnight
+    dip and smooth sensor noise. Period codes follow the time of day
+    (``glucose_store.infer_period``).
+    """
+    rng = np.random.default_rng(seed)
+    end = np.datetime64("now", "s") if end is None else np.datetime64(end, "s")
+    step = np.timedelta64(interval * 60, "s")
+    ts = (end - step * (readings - 1) + step * np.arange(readings)).astype("datetime64[ns]")
+    day = (ts.astype("datetime64[D]") - ts[0].astype("datetime64[D]")).astype(np.int64)
+    hours = (ts - ts.astype("datetime64[D]")) / np.timedelta64(1, "h")
+
+    values = np.full(readings, 110.0) + np.cumsum(rng.normal(0, 2.0, day[-1] + 1))[day]
+    amplitude = rng.normal(60, 25, (day[-1] + 1, len(MEAL_HOURS))).clip(0)
+    for meal, hour in enumerate(MEAL_HOURS):
+        x = (hours - hour) / MEAL_PEAK_HOURS
+        values += np.where(x > 0, amplitude[day, meal] * x * np.exp(1 - x), 0)
+    dips = rng.random(day[-1] + 1) < 0.15
+    values -= np.where(dips[day], 45 * np.exp(-((hours - 3.0) ** 2) / 2), 0)
+    noise = np.convolve(rng.normal(0, 4, readings + 5), np.ones(6) / np.sqrt(6), mode="valid")
+    values = np.clip(np.round(values + noise[:readings]), MIN_READING, MAX_READING).astype(np.int16)
+    return ts, values, infer_period(ts)
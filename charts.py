@@ -0,0 +1,225 @@
+import collections
+import threading
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from perf import span
+
+# Points sent to the browser for a trend line; roughly one per horizontal pixel
+MAX_POINTS = 1500
+# Above this many rendered points the trace switches to WebGL
+WEBGL_THRESHOLD = 1000
+# Markers are only drawn while individual readings are still distinguishable
+MARKER_THRESHOLD = 500
+# Box plots show every reading up to this many, precomputed quartiles beyond
+BOX_POINTS_THRESHOLD = 2000
+
+TREND_COLOR = '#3366cc'
+TARGET_FILL = 'rgba(76, 175, 80, 0.2)'
+
+
+def lttb(x, y, threshold):
+    """Downsample a series with Largest-Triangle-Three-Buckets.
+
+    Returns the indices of the ``threshold`` points that best preserve the
+    visual shape of ``(x, y)``; the first and last points are always kept.
+    ``x`` must be sorted and may be datetime64.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    xs = np.asarray(x).astype(np.int64).astype(np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third vertex of the triangle
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        area = np.abs((xs[a] - avg_x) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (avg_y - ys[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def trend_figure(timestamps, readings, target_range, title='Glucose Readings Over Time', max_points=MAX_POINTS,
+                 **layout):
+    """Build the glucose trend chart used by the Dashboard and History pages.
+
+    Long histories are reduced to ``max_points`` with LTTB, the target range
+    is drawn as a single shape instead of two full-length traces, and large
+    traces are rendered with WebGL.
+    """
+    idx = lttb(timestamps, readings, max_points)
+    x, y = np.asarray(timestamps)[idx], np.asarray(readings)[idx]
+    scatter = go.Scattergl if len(idx) > WEBGL_THRESHOLD else go.Scatter
+
+    fig = go.Figure()
+    fig.add_trace(scatter(
+        x=x,
+        y=y,
+        mode='lines+markers' if len(idx) <= MARKER_THRESHOLD else 'lines',
+        name='Glucose',
+        marker=dict(size=8, color=TREND_COLOR),
+        line=dict(width=2, color=TREND_COLOR)
+    ))
+
+    # Target range as a shaded band, with a legend-only trace to label it
+    fig.add_hrect(y0=target_range[0], y1=target_range[1], fillcolor=TARGET_FILL, line_width=0, layer='below')
+    fig.add_trace(go.Scatter(
+        x=[None],
+        y=[None],
+        mode='markers',
+        marker=dict(size=12, symbol='square', color=TARGET_FILL),
+        name='Target Range'
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title='Date and Time',
+        yaxis_title='Glucose Level (mg/dL)',
+        height=400,
+        margin=dict(l=40, r=40, t=40, b=40),
+        hovermode='closest',
+        **layout
+    )
+    return fig
+
+
+def box_figure(period_readings=None, boxes=None):
+    """Box plot of readings per time of day.
+
+    Takes either the readings of each period, drawn with every point, or
+    precomputed Tukey statistics per period (see ``range_index.box_summary``)
+    for ranges too large to send point by point.
+    """
+    fig = go.Figure()
+    if boxes is None:
+        for period, values in period_readings.items():
+            fig.add_trace(go.Box(
+                y=values,
+                name=period,
+                boxpoints='all',
+                jitter=0.3,
+                pointpos=-1.8
+            ))
+    else:
+        for period, box in boxes.items():
+            fig.add_trace(go.Box(
+                name=period,
+                x=[period],
+                **{stat: [value] for stat, value in box.items()}
+            ))
+
+    fig.update_layout(
+        title='Glucose Distribution by Time of Day',
+        yaxis_title='Glucose Level (mg/dL)',
+        height=400,
+        margin=dict(l=40, r=40, t=40, b=40)
+    )
+    return fig
+
+
+def time_in_range_gauge(percentage):
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=percentage,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Time in Range (%)"},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "#3366cc"},
+            'steps': [
+                {'range': [0, 50], 'color': "#ffcccb"},
+                {'range': [50, 70], 'color': "#ffffcc"},
+                {'range': [70, 100], 'color': "#ccffcc"}
+            ],
+            'threshold': {
+                'line': {'color': "green", 'width': 2},
+                'thickness': 0.75,
+                'value': 70
+            }
+        }
+    ))
+
+    fig.update_layout(height=250)
+    return fig
+
+
+def period_means_figure(time_averages, target_range):
+    fig = go.Figure(go.Bar(
+        x=list(time_averages.keys()),
+        y=list(time_averages.values()),
+        marker_color='#3366cc'
+    ))
+
+    fig.update_layout(
+        title='Average Glucose by Time of Day',
+        xaxis_title='Time of Day',
+        yaxis_title='Average Glucose (mg/dL)',
+        height=250
+    )
+
+    # Add a horizontal line for target range
+    target_mid = (target_range[0] + target_range[1]) / 2
+    fig.add_shape(
+        type="line",
+        x0=-0.5,
+        y0=target_mid,
+        x1=2.5,
+        y1=target_mid,
+        line=dict(
+            color="green",
+            width=2,
+            dash="dash",
+        )
+    )
+    return fig
+
+
+class FigureCache:
+    """Built figures shared across reruns and sessions, LRU-bounded by serialized size.
+
+    Callers key a figure on everything it depends on (history version,
+    target range, view parameters); while the key is unchanged the figure is
+    neither rebuilt nor revalidated. The JSON size of each figure, computed
+    once when it is stored, counts against ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._figures = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the figure for ``key``, calling ``build()`` to make it on a miss."""
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        with span("figure.build"):
+            fig = build()
+        size = len(pio.to_json(fig, validate=False))
+        with self._lock:
+            if key not in self._figures and size <= self.max_bytes:
+                self._figures[key] = (fig, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._figures.popitem(last=False)
+                    self.bytes -= evicted
+        return fig
+
+    def __len__(self):
+        return len(self._figures)
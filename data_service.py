@@ -0,0 +1,135 @@
+import json
+import os
+import re
+import threading
+import uuid
+
+from alerts import AlertEngine, AlertLog
+from glucose_patterns import DailyProfile
+from glucose_stats import GlucoseStats
+from glucose_store import GlucoseStore
+from range_index import RangeIndex
+from rec_archive import RecommendationArchive, heading
+from reading_log import ReadingLog, data_dir, user_key
+
+DIABETES_TYPES = ["Type 1", "Type 2", "Gestational", "Pre-diabetes"]
+DEFAULT_PROFILE = {"name": "", "diabetes_type": "", "target_range": [80, 130]}
+# Heading earlier versions prepended to each saved recommendation
+_LEGACY_HEADING = re.compile(r"\*\*[^*]* - (\w+) Recommendation\*\*\n\n")
+
+
+class UserData:
+    """Everything the app keeps for one user, shared by all of that user's sessions.
+
+    Holds the reading store with its running statistics, range index,
+    per-day profile (for the Meal Planner's pattern summary) and alert
+    engine, the profile (``profile.json``) and the recommendation archive
+    (``recommendations.sqlite3``), all under the user's data directory.
+    Alerts go to ``alerts``, the recent ones kept for the UI, and to
+    ``alert_sinks``.
+
+    Without a ``directory`` nothing is saved: readings, profile and
+    recommendations live in memory for as long as the object does.
+    ``key`` identifies the user in shared caches.
+    """
+
+    def __init__(self, directory=None, alert_sinks=()):
+        self.directory = directory
+        self.key = os.path.basename(directory) if directory else f"guest-{uuid.uuid4().hex}"
+        self.store = GlucoseStore.from_log(ReadingLog(directory)) if directory else GlucoseStore()
+        self.stats = GlucoseStats(self.store)
+        self.index = RangeIndex(self.store)
+        self.patterns = DailyProfile(self.store)
+        self._lock = threading.Lock()
+        self._profile_path = os.path.join(directory, "profile.json") if directory else None
+        self.recommendations = RecommendationArchive(
+            os.path.join(directory, "recommendations.sqlite3") if directory else ":memory:")
+        self.profile = dict(DEFAULT_PROFILE)
+        if directory and os.path.exists(self._profile_path):
+            with open(self._profile_path, encoding="utf-8") as f:
+                self.profile.update(json.load(f))
+        self.alerts = AlertLog()
+        self.alert_engine = AlertEngine(self.store, self.profile['target_range'], [self.alerts, *alert_sinks],
+                                        user=self.key)
+        if directory:
+            self._migrate_recommendations(os.path.join(directory, "recommendations.jsonl"))
+
+    def _migrate_recommendations(self, path):
+        # Move the plain-text history of earlier versions into the archive, then set the file aside
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    text = record["text"]
+                except (ValueError, KeyError):
+                    continue
+                match = _LEGACY_HEADING.match(text)
+                meal_type = match.group(1) if match else ""
+                self.recommendations.add(text[match.end():] if match else text, meal_type=meal_type,
+                                         created=record.get("created"))
+        os.replace(path, path + ".migrated")
+
+    def update_profile(self, **fields):
+        """Merge ``fields`` into the profile and save it if anything changed."""
+        with self._lock:
+            if all(self.profile.get(k) == v for k, v in fields.items()):
+                return
+            profile = {**self.profile, **fields}
+            if self._profile_path:
+                tmp = self._profile_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(profile, f)
+                os.replace(tmp, self._profile_path)
+            self.profile = profile
+            self.alert_engine.target_range = tuple(profile['target_range'])
+
+    def add_recommendation(self, text, **request):
+        """Archive a recommendation; ``request`` is the metadata accepted by ``RecommendationArchive.add``."""
+        self.recommendations.add(text, **request)
+
+    def last_recommendation(self):
+        """The newest recommendation as markdown with its heading, or None."""
+        last = self.recommendations.last()
+        return f"**{heading(last)}**\n\n{last['text']}" if last else None
+
+
+class DataService:
+    """Process-wide registry of ``UserData``, opened lazily and kept for the process lifetime.
+
+    Sessions only hold a user key; every session of the same user reads and
+    writes the same store, so per-session memory does not grow with the
+    history and a reading saved in one browser tab shows up in the others on
+    their next rerun. Names are matched case- and punctuation-insensitively
+    (``user_key``); each profile records the name it was created under.
+    ``alert_sinks`` receive the alerts of every user.
+    """
+
+    def __init__(self, root=None, alert_sinks=()):
+        self.root = root or data_dir()
+        self.alert_sinks = list(alert_sinks)
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def user(self, name):
+        if not (name or "").strip():
+            raise ValueError("A user needs a name; use guest() for a session without one")
+        key = user_key(name)
+        user = self._users.get(key)
+        if user is None:
+            with self._lock:
+                user = self._users.get(key)
+                if user is None:
+                    user = self._users[key] = UserData(os.path.join(self.root, key), self.alert_sinks)
+                    if not user.profile['name']:
+                        user.update_profile(name=name.strip())
+        return user
+
+    def guest(self):
+        """A private, in-memory ``UserData`` for a session without a name; nothing is shared or saved."""
+        return UserData(alert_sinks=self.alert_sinks)
+
+    def users(self):
+        """Keys of the users opened in this process."""
+        return sorted(self._users)
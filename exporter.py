@@ -0,0 +1,114 @@
+import collections
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+
+from glucose_store import PERIODS
+from perf import span
+
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    # Parquet export is optional; pyarrow is looked up here and only imported when a Parquet file is written
+    return [name for name in FORMATS if name != "Parquet" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def iter_csv(store, start=None, end=None, chunksize=50_000):
+    """Yield the rows with ``start <= timestamp < end`` as CSV, ``chunksize`` rows at a time.
+
+    The range is cut with a binary search before anything is serialized and
+    each chunk is built from slices of the store's columns, so memory stays
+    bounded by one chunk regardless of the history size. The layout matches
+    what ``import_csv`` reads back.
+    """
+    lo, hi = store.bounds(start, end)
+    header = True
+    for a in range(lo, max(hi, lo + 1), chunksize):
+        b = min(a + chunksize, hi)
+        yield store.frame(a, b).to_csv(header=header).encode()
+        header = False
+
+
+def write_csv(store, fileobj, start=None, end=None, chunksize=50_000):
+    for chunk in iter_csv(store, start, end, chunksize):
+        fileobj.write(chunk)
+
+
+def write_parquet(store, fileobj, start=None, end=None, chunksize=50_000):
+    """Write the rows with ``start <= timestamp < end`` as zstd-compressed Parquet, one row group per chunk."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    schema = pa.schema([
+        ('Timestamp', pa.timestamp('ns')),
+        ('Reading', pa.int16()),
+        ('Period', pa.dictionary(pa.int8(), pa.string())),
+        ('Notes', pa.string()),
+    ])
+    periods = pa.array(PERIODS, pa.string())
+    lo, hi = store.bounds(start, end)
+    with pq.ParquetWriter(fileobj, schema, compression='zstd') as writer:
+        for a in range(lo, hi, chunksize):
+            b = min(a + chunksize, hi)
+            writer.write_batch(pa.record_batch([
+                pa.array(store.timestamps[a:b], pa.timestamp('ns')),
+                pa.array(store.readings[a:b], pa.int16()),
+                pa.DictionaryArray.from_arrays(pa.array(store.period_codes[a:b], pa.int8()), periods),
+                pa.array(store.notes[a:b], pa.string()),
+            ], schema=schema))
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet}
+
+
+class ExportCache:
+    """Exported files on disk, keyed by (user, history version, range, format).
+
+    Each export is written once to a temporary file and reused until the
+    history changes; at most ``max_entries`` files are kept, least recently
+    used first out.
+    """
+
+    def __init__(self, directory=None, max_entries=8):
+        self.directory = directory or tempfile.mkdtemp(prefix="gluco-export-")
+        self.max_entries = max_entries
+        self._paths = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def path(self, store, user, fmt, start=None, end=None):
+        """Return the path of the export, writing it first if it is not cached."""
+        key = (user, store.version, start, end, fmt)
+        with self._lock:
+            if key in self._paths:
+                self._paths.move_to_end(key)
+                return self._paths[key]
+            extension = FORMATS[fmt][0]
+            fd, path = tempfile.mkstemp(suffix="." + extension, dir=self.directory)
+            with os.fdopen(fd, "wb") as f, span(f"export.{extension}"):
+                WRITERS[fmt](store, f, start, end)
+            self._paths[key] = path
+            while len(self._paths) > self.max_entries:
+                _, evicted = self._paths.popitem(last=False)
+                os.remove(evicted)
+            return path
+
+    def read(self, store, user, fmt, start=None, end=None):
+        """Return the export's contents, writing it first if it is not cached."""
+        # Under the lock so another export can't evict the file between finding and reading it
+        with self._lock:
+            with open(self.path(store, user, fmt, start, end), "rb") as f:
+                return f.read()
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
@@ -0,0 +1,249 @@
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+
+# Food categories that also work as terms, each standing for every food in the category
+GROUPS = {"vegetable": "vegetables", "fruit": "fruit", "legume": "legumes", "dairy": "dairy"}
+SUGGESTIONS = 5
+# Edits allowed when matching a misspelt entry: one per this many characters, between one and MAX_EDITS
+CHARS_PER_EDIT = 4
+MAX_EDITS = 2
+# Terms sharing the most trigrams with a misspelt entry that are checked by edit distance
+FUZZY_CANDIDATES = 32
+
+_SPLIT = re.compile(r"[,;/\n]+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _singular(word):
+    if len(word) <= 3 or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    return word[:-1]
+
+
+def normalize(text):
+    """Lookup key of a food name: lowercase ASCII words, singular, single-spaced ("Tomatoes" -> "tomato")."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return " ".join(_singular(word) for word in _WORD.findall(text))
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it is known to exceed ``limit``.
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed, so the
+    cost is O(len(a) * limit) rather than O(len(a) * len(b)).
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if lo == 1:
+            current[0] = i if i <= limit else over
+        for j in range(lo, hi + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+        if min(current[lo - 1:hi + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def _max_edits(key):
+    return min(MAX_EDITS, max(1, len(key) // CHARS_PER_EDIT))
+
+
+class _TrigramIndex:
+    """Trigram postings over a list of keys, for finding the keys within a few edits of a string.
+
+    Each trigram's posting list is ordered by key length, with the lengths
+    alongside, so a lookup only counts keys of a compatible length.
+    """
+
+    def __init__(self, keys):
+        self.keys = keys
+        self._lengths = np.array([len(key) for key in keys])
+        postings = {}
+        for i in np.argsort(self._lengths, kind="stable").tolist():
+            for gram in _trigrams(keys[i]):
+                postings.setdefault(gram, []).append(i)
+        self._grams = {}
+        for gram, ids in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            self._grams[gram] = ids, self._lengths[ids].astype(np.int16)
+
+    def nearest(self, key, max_edits):
+        """``(edit distance, key index)`` of the closest key within ``max_edits`` of ``key``, or None."""
+        grams = _trigrams(key)
+        postings = []
+        for gram in grams:
+            if gram in self._grams:
+                ids, lengths = self._grams[gram]
+                lo, hi = np.searchsorted(lengths, (len(key) - max_edits, len(key) + max_edits + 1))
+                postings.append(ids[lo:hi])
+        if not postings:
+            return None
+        shared = np.bincount(np.concatenate(postings))
+        # An edit destroys at most three of the key's trigrams, so closer keys share at least this many
+        candidates = np.flatnonzero(shared >= len(grams) - 3 * max_edits)
+        candidates = candidates[np.argsort(-shared[candidates], kind="stable")[:FUZZY_CANDIDATES]]
+        matches = []
+        for i in candidates.tolist():
+            distance = edit_distance(key, self.keys[i], max_edits)
+            if distance <= max_edits:
+                matches.append((distance, len(self.keys[i]), i))
+        if not matches:
+            return None
+        distance, _, i = min(matches)
+        return distance, i
+
+
+class FoodLexicon:
+    """Food names and synonyms mapped to stable food IDs, for parsing and completing food entries.
+
+    Terms are keyed by their normalized form; a key several foods share
+    ("rice") maps to all of their IDs. Exact lookups are a dict hit. Prefix
+    completion bisects a sorted array of every word-boundary suffix of every
+    key, so "chick" finds "chickpeas" and "grilled chicken breast": the
+    flattened form of a trie over the keys and their inner words, at a
+    fraction of the memory of a node-per-character trie. Misspellings go
+    through trigram indexes over the vocabulary and over the terms: the
+    words or terms sharing the most trigrams with the entry are checked
+    with a bounded edit distance.
+    """
+
+    def __init__(self, entries):
+        self.terms, self.keys, self.ids = [], [], []
+        self._index = {}
+        for term, food_id in entries:
+            key = normalize(term)
+            if not key:
+                continue
+            i = self._index.get(key)
+            if i is None:
+                i = self._index[key] = len(self.keys)
+                self.terms.append(term)
+                self.keys.append(key)
+                self.ids.append(())
+            if food_id not in self.ids[i]:
+                self.ids[i] += (food_id,)
+
+        suffixes = sorted((key[m.end():] if m else key, i) for i, key in enumerate(self.keys)
+                          for m in [None, *re.finditer(" ", key)])
+        self._prefix_keys = [suffix for suffix, _ in suffixes]
+        self._prefix_terms = np.array([i for _, i in suffixes], dtype=np.int32)
+
+        self._terms = _TrigramIndex(self.keys)
+        words = sorted({word for key in self.keys for word in key.split()})
+        self._vocabulary = set(words)
+        self._words = _TrigramIndex(words)
+
+    @classmethod
+    def from_table(cls, table):
+        """Lexicon of a ``nutrition.FoodTable``: every food's name, its synonyms and its category group."""
+        def entries():
+            for i, food_id in enumerate(table.ids.tolist()):
+                yield table.names[i], food_id
+                for synonym in table.synonyms[i]:
+                    yield synonym, food_id
+                if table.categories[i] in GROUPS:
+                    yield GROUPS[table.categories[i]], food_id
+        return cls(entries())
+
+    def __len__(self):
+        return len(self.terms)
+
+    def lookup(self, text):
+        """Index of the term whose key matches ``text`` exactly, or None."""
+        return self._index.get(normalize(text))
+
+    def complete(self, prefix, limit=SUGGESTIONS):
+        """Terms with a word starting with ``prefix``: whole-term prefixes first, then shortest."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        lo = bisect.bisect_left(self._prefix_keys, key)
+        hi = bisect.bisect_left(self._prefix_keys, key + "{", lo, min(len(self._prefix_keys), lo + limit * 16))
+        found = dict.fromkeys(self._prefix_terms[lo:hi].tolist())
+        ranked = sorted(found, key=lambda i: (not self.keys[i].startswith(key), len(self.keys[i]), self.keys[i]))
+        return [self.terms[i] for i in ranked[:limit]]
+
+    def fuzzy(self, text):
+        """``(edit distance, term index)`` of the closest term to a misspelt ``text``, or None.
+
+        Misspelt words are first corrected against the lexicon's vocabulary
+        and the corrected term looked up, which stays fast however many
+        terms share those words; entries that don't resolve that way (a
+        missing space, a word not in the vocabulary) search all terms.
+        """
+        key = normalize(text)
+        if not key:
+            return None
+        edits, words = 0, []
+        for word in key.split():
+            if word not in self._vocabulary:
+                nearest = self._words.nearest(word, _max_edits(word))
+                if nearest is None:
+                    break
+                edits += nearest[0]
+                word = self._words.keys[nearest[1]]
+            words.append(word)
+        else:
+            i = self._index.get(" ".join(words))
+            if i is not None and edits <= _max_edits(key):
+                return edits, i
+        return self._terms.nearest(key, _max_edits(key))
+
+    def _entry(self, text, i, distance):
+        return {"text": text, "term": self.terms[i], "ids": self.ids[i], "distance": distance}
+
+    def _resolve(self, item):
+        key = normalize(item)
+        i = self._index.get(key)
+        if i is not None:
+            return [self._entry(item, i, 0)]
+        nearest = self.fuzzy(key)
+        if nearest is not None:
+            return [self._entry(item, nearest[1], nearest[0])]
+        # Known foods inside a longer entry ("rice and beans", "grilled salmon"), longest first
+        words, found, start = key.split(), [], 0
+        while start < len(words):
+            for end in range(len(words), start, -1):
+                i = self._index.get(" ".join(words[start:end]))
+                if i is not None:
+                    found.append(self._entry(" ".join(words[start:end]), i, 0))
+                    start = end
+                    break
+            else:
+                # A misspelt single-word food ("beens")
+                nearest = self.fuzzy(words[start]) if len(words[start]) > 3 else None
+                if nearest is not None:
+                    found.append(self._entry(words[start], nearest[1], nearest[0]))
+                start += 1
+        return found or [{"text": item, "term": None, "ids": (), "distance": None,
+                          "suggestions": self.complete(words[-1])}]
+
+    def parse(self, text):
+        """Split a comma separated food list and resolve each entry to canonical terms and food IDs.
+
+        Returns one dict per recognized food (``text``, ``term``, ``ids``, and
+        ``distance``, the edits from a misspelt entry) and per unrecognized
+        entry (``term`` None, with prefix ``suggestions``).
+        """
+        entries = []
+        for item in _SPLIT.split(text or ""):
+            if normalize(item):
+                entries.extend(self._resolve(item.strip()))
+        return entries
@@ -0,0 +1,199 @@
+import math
+
+import numpy as np
+
+from glucose_store import AFTER_MEAL, BEFORE_MEAL, BUCKETS, MAX_READING, PERIOD_BUCKET, PERIOD_MEAL, PERIODS
+
+# Days of history the Meal Planner prompt summarizes, ending at the latest reading
+SUMMARY_DAYS = 14
+# Upper bound on the summary's size in the prompt (estimated tokens)
+TOKEN_BUDGET = 200
+# Meals whose before/after readings are paired into post-meal excursions, by time-of-day bucket
+MEALS = {"Breakfast": "Morning", "Lunch": "Afternoon", "Dinner": "Evening"}
+# Post-meal rise (mg/dL) counted as a large excursion
+LARGE_EXCURSION = 50
+HYPO_BELOW, HYPER_ABOVE = 70, 180
+
+_DAY = np.timedelta64(1, "D")
+
+
+def estimate_tokens(text):
+    """Rough token count of ``text`` for budgeting: about four characters per token."""
+    return math.ceil(len(text) / 4)
+
+
+class DailyProfile:
+    """Per-day, per-period sums of a ``GlucoseStore``'s readings, kept current on insert.
+
+    Cell ``(day, period code)`` holds the count, sum and sum of squares of
+    that day's readings in that period, so pattern features over any run of
+    days (period means and spread, the trend of daily means, before/after
+    meal pairs) cost O(days x periods) instead of a pass over the readings.
+    A new reading updates one cell; a reading on a day outside the covered
+    span first grows the arrays to include it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.origin = None
+        self.count = np.zeros((0, len(PERIODS)), dtype=np.int64)
+        self.total = np.zeros((0, len(PERIODS)), dtype=np.float64)
+        self.total_sq = np.zeros((0, len(PERIODS)), dtype=np.float64)
+        with store.lock:
+            self._add(store.timestamps, store.period_codes, store.readings)
+            store.subscribe(self._on_insert)
+
+    def _on_insert(self, positions):
+        # Runs under the store's lock
+        self._add(self.store.timestamps[positions], self.store.period_codes[positions],
+                  self.store.readings[positions])
+
+    def _add(self, timestamps, codes, readings):
+        if not len(timestamps):
+            return
+        days = timestamps.astype("datetime64[D]")
+        first, last = days.min(), days.max()
+        origin = first if self.origin is None else min(self.origin, first)
+        shift = 0 if self.origin is None else (self.origin - origin) // _DAY
+        size = max(len(self.count) + shift, (last - origin) // _DAY + 1)
+        if size > len(self.count):
+            for name in ("count", "total", "total_sq"):
+                old = getattr(self, name)
+                grown = np.zeros((size, len(PERIODS)), dtype=old.dtype)
+                grown[shift:shift + len(old)] = old
+                setattr(self, name, grown)
+            self.origin = origin
+        cells = (days - origin).astype(np.intp) * len(PERIODS) + codes
+        values = readings.astype(np.float64)
+        n = self.count.size
+        self.count += np.bincount(cells, minlength=n).reshape(self.count.shape)
+        self.total += np.bincount(cells, weights=values, minlength=n).reshape(self.count.shape)
+        self.total_sq += np.bincount(cells, weights=values * values, minlength=n).reshape(self.count.shape)
+
+    def span(self, days):
+        """Return ``(first day, count, total, total_sq)`` for the ``days`` days up to the latest reading.
+
+        The arrays are copies, shaped ``(days covered, len(PERIODS))``.
+        """
+        with self.store.lock:
+            if self.origin is None:
+                return None
+            end = (self.store.timestamps[-1].astype("datetime64[D]") - self.origin) // _DAY + 1
+            start = max(0, end - days)
+            return (self.origin + np.timedelta64(start, "D"), self.count[start:end].copy(),
+                    self.total[start:end].copy(), self.total_sq[start:end].copy())
+
+
+def _mean_std(count, total, total_sq):
+    if not count:
+        return None, None
+    mean = total / count
+    std = math.sqrt(max(total_sq - total * mean, 0.0) / (count - 1)) if count > 1 else 0.0
+    return mean, std
+
+
+def pattern_summary(profile, index, target_range, days=SUMMARY_DAYS):
+    """Extract the glucose pattern features of the last ``days`` days of history, or None without readings.
+
+    Uses the ``DailyProfile`` for period means and spread, the daily-mean
+    trend and post-meal excursions, and the ``RangeIndex`` for exact
+    time-in-range over the same days.
+    """
+    span = profile.span(days)
+    if span is None:
+        return None
+    first_day, count, total, total_sq = span
+    start = first_day.astype("datetime64[ns]")
+    window = index.aggregate(start, start + np.timedelta64(len(count), "D"))
+
+    periods = {}
+    for b, bucket in enumerate(BUCKETS[:4]):
+        codes = PERIOD_BUCKET == b
+        mean, std = _mean_std(count[:, codes].sum(), total[:, codes].sum(), total_sq[:, codes].sum())
+        if mean is not None:
+            periods[bucket] = {"mean": float(mean), "std": std, "count": int(count[:, codes].sum())}
+
+    # Least-squares slope of the daily means over the days with readings
+    day_count = count.sum(axis=1)
+    logged = np.flatnonzero(day_count)
+    trend = None
+    if len(logged) >= 3:
+        trend = float(np.polyfit(logged, total.sum(axis=1)[logged] / day_count[logged], 1)[0])
+
+    # Same-day pairs of before- and after-meal means
+    excursions = {}
+    for meal, bucket in MEALS.items():
+        b = BUCKETS.index(bucket)
+        before = (PERIOD_BUCKET == b) & (PERIOD_MEAL == BEFORE_MEAL)
+        after = (PERIOD_BUCKET == b) & (PERIOD_MEAL == AFTER_MEAL)
+        nb, na = count[:, before].sum(axis=1), count[:, after].sum(axis=1)
+        paired = (nb > 0) & (na > 0)
+        if paired.any():
+            rise = total[paired][:, after].sum(axis=1) / na[paired] - total[paired][:, before].sum(axis=1) / nb[paired]
+            excursions[meal] = {"mean_rise": float(rise.mean()), "max_rise": float(rise.max()),
+                                "pairs": int(paired.sum()), "large": int((rise > LARGE_EXCURSION).sum())}
+
+    low, high = target_range
+    return {
+        "first_day": str(first_day),
+        "last_day": str(first_day + np.timedelta64(len(count) - 1, "D")),
+        "days_logged": int(len(logged)),
+        "count": window.count,
+        "mean": window.mean,
+        "std": window.std or 0.0,
+        "target_range": (low, high),
+        "in_range": window.in_range(low, high) / window.count,
+        "below": window.in_range(0, HYPO_BELOW - 1) / window.count,
+        "above": window.in_range(HYPER_ABOVE + 1, MAX_READING) / window.count,
+        "trend": trend,
+        "periods": periods,
+        "excursions": excursions,
+    }
+
+
+def summary_lines(summary):
+    """Render the features as prompt lines, most important first."""
+    lines = [
+        f"{summary['first_day']} to {summary['last_day']} ({summary['count']} readings on "
+        f"{summary['days_logged']} days): mean {summary['mean']:.0f} mg/dL, SD {summary['std']:.0f} "
+        f"(CV {summary['std'] / summary['mean']:.0%})"
+        + (f", trend {summary['trend']:+.1f} mg/dL per day" if summary['trend'] is not None else "") + ".",
+        f"Time in range {summary['target_range'][0]}-{summary['target_range'][1]}: {summary['in_range']:.0%}; "
+        f"below {HYPO_BELOW}: {summary['below']:.0%}; above {HYPER_ABOVE}: {summary['above']:.0%}.",
+    ]
+    for meal, e in summary['excursions'].items():
+        lines.append(f"{meal}: rises {e['mean_rise']:+.0f} mg/dL on average (max {e['max_rise']:+.0f}), "
+                     f"over +{LARGE_EXCURSION} on {e['large']} of {e['pairs']} days.")
+    if summary['periods']:
+        lines.append("By time of day: " + "; ".join(
+            f"{bucket} mean {p['mean']:.0f} (SD {p['std']:.0f})" for bucket, p in summary['periods'].items()) + ".")
+    return lines
+
+
+def format_summary(summary, budget=TOKEN_BUDGET):
+    """Join the summary lines that fit within ``budget`` estimated tokens, in priority order."""
+    text = ""
+    for line in summary_lines(summary):
+        candidate = f"{text}\n- {line}" if text else f"- {line}"
+        if estimate_tokens(candidate) > budget:
+            break
+        text = candidate
+    return text
+
+
+def summary_key(summary):
+    """Coarse, hashable form of a summary for recommendation cache keys.
+
+    Features are rounded to steps that would not change the advice, so a
+    new reading does not make every cached recommendation miss.
+    """
+    if summary is None:
+        return None
+    return {
+        "mean": round(summary['mean'] / 10) * 10,
+        "in_range": round(summary['in_range'] * 10) / 10,
+        "below": summary['below'] > 0.04,
+        "above": summary['above'] > 0.25,
+        "trend": 0 if summary['trend'] is None or abs(summary['trend']) < 1 else int(math.copysign(1, summary['trend'])),
+        "excursions": {meal: e['mean_rise'] > LARGE_EXCURSION for meal, e in summary['excursions'].items()},
+    }
@@ -0,0 +1,267 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from glucose_store import BUCKETS, MAX_READING, PERIOD_BUCKET, to_datetime64
+
+# Trailing windows (in days) maintained alongside the all-time totals
+WINDOWS = (7, 14, 30, 90)
+
+
+class ReadingHistogram:
+    """Counts of readings per integer mg/dL value, indexed by a Fenwick tree.
+
+    Readings are bounded integers, so order statistics do not need the
+    readings themselves: rank queries, range counts and quantiles are
+    O(log V) over the ``V = MAX_READING + 1`` possible values, no matter how
+    many readings have been counted.
+    """
+
+    # Above this many values a bulk update rebuilds the tree in O(V) instead
+    _BULK = 32
+
+    def __init__(self, size=MAX_READING + 1):
+        self.size = size
+        self.counts = np.zeros(size, dtype=np.int64)
+        self._tree = [0] * (size + 1)
+        self._top = 1 << (size.bit_length() - 1)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build a histogram from a per-value count array in O(V)."""
+        hist = cls(len(counts))
+        hist.counts = np.asarray(counts, dtype=np.int64).copy()
+        hist._rebuild()
+        return hist
+
+    def add(self, values, sign=1):
+        values = np.clip(np.asarray(values, dtype=np.int64), 0, self.size - 1)
+        if values.size > self._BULK:
+            self.counts += sign * np.bincount(values, minlength=self.size)
+            self._rebuild()
+            return
+        tree = self._tree
+        for v in values.tolist():
+            self.counts[v] += sign
+            i = v + 1
+            while i <= self.size:
+                tree[i] += sign
+                i += i & -i
+
+    def _rebuild(self):
+        tree = [0] + self.counts.tolist()
+        for i in range(1, self.size + 1):
+            j = i + (i & -i)
+            if j <= self.size:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def count_le(self, value):
+        """Return the number of readings ``<= value``."""
+        i = min(int(value), self.size - 1) + 1
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def count_between(self, low, high):
+        low, high = max(int(low), 0), min(int(high), self.size - 1)
+        if low > high:
+            return 0
+        return self.count_le(high) - (self.count_le(low - 1) if low else 0)
+
+    def kth(self, k):
+        """Return the ``k``-th smallest reading (0-based)."""
+        pos, step, tree = 0, self._top, self._tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and tree[nxt] <= k:
+                pos = nxt
+                k -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def quantile(self, q, count):
+        """Return the ``q`` quantile of ``count`` readings, interpolated like pandas."""
+        if not count:
+            return None
+        position = q * (count - 1)
+        below = int(position)
+        lower = self.kth(below)
+        if position == below:
+            return float(lower)
+        upper = self.kth(below + 1)
+        return lower + (upper - lower) * (position - below)
+
+
+class RunningAggregate:
+    """Running count, sum, sum of squares and value histogram of readings.
+
+    Adding or removing readings is O(1) each; time-in-range for any target
+    range and quantiles are read off the histogram without touching the
+    readings. Counts and sums are also kept per time-of-day bucket.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.hist = ReadingHistogram()
+        self.bucket_count = np.zeros(len(BUCKETS), dtype=np.int64)
+        self.bucket_total = np.zeros(len(BUCKETS), dtype=np.int64)
+
+    @classmethod
+    def from_counts(cls, bucket_counts):
+        """Build an aggregate from a ``(len(BUCKETS), V)`` array of per-bucket value counts."""
+        bucket_counts = np.asarray(bucket_counts, dtype=np.int64)
+        counts = bucket_counts.sum(axis=0)
+        values = np.arange(counts.size, dtype=np.int64)
+        agg = cls()
+        agg.count = int(counts.sum())
+        agg.total = int(counts @ values)
+        agg.total_sq = int(counts @ (values * values))
+        agg.hist = ReadingHistogram.from_counts(counts)
+        agg.bucket_count = bucket_counts.sum(axis=1)
+        agg.bucket_total = bucket_counts @ values
+        return agg
+
+    def add(self, values, period_codes, sign=1):
+        values = np.asarray(values, dtype=np.int64)
+        if not values.size:
+            return
+        self.count += sign * values.size
+        self.total += sign * int(values.sum())
+        self.total_sq += sign * int((values * values).sum())
+        self.hist.add(values, sign)
+        buckets = PERIOD_BUCKET[np.asarray(period_codes)]
+        self.bucket_count += sign * np.bincount(buckets, minlength=len(BUCKETS))
+        self.bucket_total += sign * np.bincount(buckets, weights=values, minlength=len(BUCKETS)).astype(np.int64)
+
+    def remove(self, values, period_codes):
+        self.add(values, period_codes, sign=-1)
+
+    def bucket_means(self, buckets=BUCKETS):
+        """Return ``{bucket: mean}`` for the requested buckets that have readings."""
+        means = {}
+        for name in buckets:
+            b = BUCKETS.index(name)
+            if self.bucket_count[b]:
+                means[name] = float(self.bucket_total[b] / self.bucket_count[b])
+        return means
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def std(self):
+        # Sample standard deviation, matching pandas' Series.std()
+        if self.count < 2:
+            return None
+        var = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return max(var, 0.0) ** 0.5
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+    @property
+    def min(self):
+        return self.hist.kth(0) if self.count else None
+
+    @property
+    def max(self):
+        return self.hist.kth(self.count - 1) if self.count else None
+
+    def quantile(self, q):
+        return self.hist.quantile(q, self.count)
+
+    def in_range(self, low, high):
+        """Return the number of readings with ``low <= reading <= high``."""
+        return self.hist.count_between(low, high)
+
+
+class _Window(RunningAggregate):
+    def __init__(self, days):
+        super().__init__()
+        self.days = days
+        self.lo = 0
+        self.cutoff = None
+
+
+class GlucoseStats:
+    """Incrementally maintained statistics over a ``GlucoseStore``.
+
+    Keeps all-time totals plus trailing-window totals for ``WINDOWS``. Each new
+    reading updates every aggregate in O(1) through the store's insert hook;
+    ``window()`` moves the window start forward with a binary search over the
+    sorted timestamps and subtracts only the readings that just expired.
+    The latest reading of each time-of-day bucket is tracked the same way.
+    """
+
+    def __init__(self, store, windows=WINDOWS):
+        self.store = store
+        self._lock = threading.Lock()
+        self.overall = RunningAggregate()
+        self._windows = {days: _Window(days) for days in windows}
+        self._latest = [None] * len(BUCKETS)
+        # Under the store's lock so no insert lands between the snapshot and the subscription
+        with store.lock:
+            self.overall.add(store.readings, store.period_codes)
+            if len(store):
+                last = np.full(len(BUCKETS), -1)
+                np.maximum.at(last, store.bucket_codes, np.arange(len(store)))
+                for bucket, pos in enumerate(last):
+                    if pos >= 0:
+                        self._latest[bucket] = (store.timestamps[pos], int(store.readings[pos]))
+            store.subscribe(self._on_insert)
+
+    def _on_insert(self, positions):
+        with self._lock:
+            readings = self.store.readings[positions]
+            codes = self.store.period_codes[positions]
+            ts = self.store.timestamps[positions]
+            self.overall.add(readings, codes)
+            for w in self._windows.values():
+                if w.cutoff is None:
+                    continue
+                # Rows older than the window only shift its start
+                expired = ts < w.cutoff
+                w.lo += int(expired.sum())
+                w.add(readings[~expired], codes[~expired])
+            buckets = PERIOD_BUCKET[codes]
+            for bucket in np.unique(buckets):
+                # Positions are in time order, so the last match is the newest
+                i = np.flatnonzero(buckets == bucket)[-1]
+                latest = self._latest[bucket]
+                if latest is None or ts[i] >= latest[0]:
+                    self._latest[bucket] = (ts[i], int(readings[i]))
+
+    def latest(self, bucket):
+        """Return the most recent reading in a time-of-day bucket, or None."""
+        entry = self._latest[BUCKETS.index(bucket)]
+        return entry[1] if entry else None
+
+    def window(self, days=None, now=None):
+        """Return the aggregate for the trailing ``days``, or all time when None."""
+        if days is None:
+            return self.overall
+        # The store's lock first, as inserts take it before calling _on_insert: positions and columns can't move
+        # under a concurrent insert (another session, the ingest writer) while the window catches up
+        with self.store.lock, self._lock:
+            w = self._windows[days]
+            now = datetime.now() if now is None else now
+            cutoff = to_datetime64(now) - np.timedelta64(days, "D")
+            readings, codes = self.store.readings, self.store.period_codes
+            lo = int(np.searchsorted(self.store.timestamps, cutoff, "left"))
+            if w.cutoff is None:
+                w.add(readings[lo:], codes[lo:])
+            elif lo > w.lo:
+                w.remove(readings[w.lo:lo], codes[w.lo:lo])
+            elif lo < w.lo:
+                w.add(readings[lo:w.lo], codes[lo:w.lo])
+            w.lo, w.cutoff = lo, cutoff
+            return w
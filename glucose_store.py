@@ -0,0 +1,316 @@
+import threading
+
+import numpy as np
+
+# Options offered by the "Time Period" selectbox in Log Glucose. The position
+# in this list is the categorical code stored for each reading.
+PERIODS = [
+    "Morning (Before Breakfast)",
+    "Morning (After Breakfast)",
+    "Afternoon (Before Lunch)",
+    "Afternoon (After Lunch)",
+    "Evening (Before Dinner)",
+    "Evening (After Dinner)",
+    "Bedtime",
+    "Other",
+]
+
+# Time-of-day buckets the views group by, and the bucket / meal flag of each
+# period code, resolved once per reading instead of by string matching.
+BUCKETS = ["Morning", "Afternoon", "Evening", "Bedtime", "Other"]
+BEFORE_MEAL, AFTER_MEAL, NO_MEAL = 0, 1, 2
+PERIOD_BUCKET = np.array([0, 0, 1, 1, 2, 2, 3, 4], dtype=np.int8)
+PERIOD_MEAL = np.array([BEFORE_MEAL, AFTER_MEAL] * 3 + [NO_MEAL, NO_MEAL], dtype=np.int8)
+
+MIN_READING = 40
+MAX_READING = 500
+
+_PERIOD_CODES = {name: code for code, name in enumerate(PERIODS)}
+
+
+def to_datetime64(value):
+    """Convert a datetime, date, ISO string or Timestamp to ``datetime64[ns]`` without going through pandas."""
+    return np.datetime64(value, "ns")
+
+
+def infer_period(timestamps):
+    """Period codes from the time of day, for readings that come without one (CGM exports and feeds)."""
+    ts = np.asarray(timestamps, dtype="datetime64[ns]")
+    hours = (ts - ts.astype("datetime64[D]")) // np.timedelta64(1, "h")
+    return np.select(
+        [(hours >= 5) & (hours < 11), (hours >= 11) & (hours < 17), (hours >= 17) & (hours < 21)],
+        [0, 2, 4],
+        default=6
+    ).astype(np.int8)
+
+
+def split_by_bucket(period_codes, values):
+    """Group ``values`` by the time-of-day bucket of ``period_codes``.
+
+    Returns ``{bucket name: values}`` for the non-empty buckets, in row order,
+    using one stable sort over the int8 bucket codes.
+    """
+    buckets = PERIOD_BUCKET[period_codes]
+    order = np.argsort(buckets, kind="stable")
+    ends = np.cumsum(np.bincount(buckets, minlength=len(BUCKETS)))
+    groups = {}
+    start = 0
+    for bucket, end in enumerate(ends):
+        if end > start:
+            groups[BUCKETS[bucket]] = values[order[start:end]]
+        start = end
+    return groups
+
+
+class GlucoseStore:
+    """Columnar, time-sorted glucose reading store with amortized O(1) appends.
+
+    Columns live in pre-grown NumPy arrays that double in capacity when full,
+    so saving a reading never copies the existing history. Rows are kept
+    sorted by timestamp as they are inserted: a reading newer than the last
+    one is a plain append, a backdated one shifts only the rows after it.
+    Views read the live rows through the column properties, ``window()`` or
+    ``to_frame()``, which is rebuilt at most once per ``version``.
+
+    A store opened with ``from_log()`` starts out on the log's read-only
+    memory map and mirrors every new reading into the log.
+
+    Writes are serialized by ``lock`` so several sessions can share a store.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(int(capacity), 1)
+        self._ts = np.empty(capacity, dtype="datetime64[ns]")
+        self._reading = np.empty(capacity, dtype=np.int16)
+        self._period = np.empty(capacity, dtype=np.int8)
+        self._notes = np.empty(capacity, dtype=object)
+        self._size = 0
+        self.version = 0
+        self._frame = None
+        self._frame_version = -1
+        self._log = None
+        self._listeners = []
+        # Serializes writers (sessions of the same user share a store); readers take views without it
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_log(cls, log):
+        """Open a store over a ``ReadingLog``.
+
+        When the log is already in time order (the normal case) the columns
+        are zero-copy views of its memory map; they are only copied into
+        private arrays the first time the store has to grow.
+        """
+        records, notes = log.load()
+        store = cls(capacity=1)
+        n = len(records)
+        if n:
+            ts = records['ts'].view("datetime64[ns]")
+            if np.all(ts[1:] >= ts[:-1]):
+                rows = np.arange(n)
+                store._ts, store._reading, store._period = ts, records['reading'], records['period']
+            else:
+                order = np.argsort(ts, kind="stable")
+                rows = np.empty(n, dtype=np.intp)
+                rows[order] = np.arange(n)
+                store._ts = ts[order]
+                store._reading = records['reading'][order]
+                store._period = records['period'][order]
+            store._notes = np.full(n, "", dtype=object)
+            for row, text in notes.items():
+                store._notes[rows[row]] = text
+            store._size = n
+        store._log = log
+        return store
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    @property
+    def capacity(self):
+        return len(self._ts)
+
+    def _reserve(self, needed):
+        if needed <= self.capacity and self._ts.flags.writeable:
+            return
+        new_capacity = max(needed, 2 * self.capacity)
+        for name in ("_ts", "_reading", "_period", "_notes"):
+            old = getattr(self, name)
+            grown = np.empty(new_capacity, dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def subscribe(self, listener):
+        """Call ``listener(positions)`` after each insert with the new rows' positions."""
+        self._listeners.append(listener)
+
+    def add(self, timestamp, reading, period, notes=""):
+        """Insert a reading at its time-ordered position and return that position."""
+        with self.lock:
+            if period not in _PERIOD_CODES:
+                raise ValueError(f"Unknown period: {period!r}")
+            ts = to_datetime64(timestamp)
+            code = _PERIOD_CODES[period]
+            if self._log is not None:
+                self._log.append(ts, reading, code, notes)
+            self._reserve(self._size + 1)
+            n = self._size
+            if n and ts < self._ts[n - 1]:
+                pos = int(np.searchsorted(self._ts[:n], ts, side="right"))
+                for name in ("_ts", "_reading", "_period", "_notes"):
+                    col = getattr(self, name)
+                    col[pos + 1:n + 1] = col[pos:n]
+            else:
+                pos = n
+            self._ts[pos] = ts
+            self._reading[pos] = reading
+            self._period[pos] = code
+            self._notes[pos] = notes or ""
+            self._size += 1
+            self.version += 1
+            self._notify(np.array([pos]))
+            return pos
+
+    def extend(self, timestamps, readings, period_codes, notes=None):
+        """Insert a batch of readings and return their positions.
+
+        ``period_codes`` index into ``PERIODS``. The batch is sorted once and
+        merged into the existing rows in a single O(n + m) pass instead of m
+        separate inserts; a batch newer than the history is a plain append.
+        """
+        with self.lock:
+            order = np.argsort(np.asarray(timestamps, dtype="datetime64[ns]"), kind="stable")
+            ts = np.asarray(timestamps, dtype="datetime64[ns]")[order]
+            m = len(ts)
+            if not m:
+                return np.empty(0, dtype=np.intp)
+            readings = np.asarray(readings, dtype=np.int16)[order]
+            codes = np.asarray(period_codes, dtype=np.int8)[order]
+            if ((codes < 0) | (codes >= len(PERIODS))).any():
+                raise ValueError("Unknown period code")
+            notes = np.full(m, "", dtype=object) if notes is None else np.asarray(notes, dtype=object)[order]
+            if self._log is not None:
+                self._log.extend(ts, readings, codes, notes)
+
+            n = self._size
+            columns = (("_ts", ts), ("_reading", readings), ("_period", codes), ("_notes", notes))
+            if not n or ts[0] >= self._ts[n - 1]:
+                self._reserve(n + m)
+                positions = np.arange(n, n + m)
+                for name, values in columns:
+                    getattr(self, name)[n:n + m] = values
+            else:
+                old_ts = self._ts[:n]
+                positions = np.searchsorted(old_ts, ts, side="right") + np.arange(m)
+                old_positions = np.arange(n) + np.searchsorted(ts, old_ts, side="left")
+                capacity = max(n + m, 2 * self.capacity if n + m > self.capacity else self.capacity)
+                for name, values in columns:
+                    old = getattr(self, name)
+                    merged = np.empty(capacity, dtype=old.dtype)
+                    merged[old_positions] = old[:n]
+                    merged[positions] = values
+                    setattr(self, name, merged)
+            self._size += m
+            self.version += 1
+            self._notify(positions)
+            return positions
+
+    def extend_new(self, timestamps, readings, period_codes, notes=None):
+        """Insert the readings whose timestamp isn't in the history yet and return their positions.
+
+        Of several readings with the same timestamp in the batch only the
+        first is kept, so a file or device sending readings again doesn't
+        duplicate them.
+        """
+        ts = np.asarray(timestamps, dtype="datetime64[ns]")
+        _, first = np.unique(ts, return_index=True)
+        keep = np.zeros(len(ts), dtype=bool)
+        keep[first] = True
+        # Under the writer lock so a reading saved meanwhile can't slip past the check
+        with self.lock:
+            existing = self.timestamps
+            if len(existing):
+                hits = np.searchsorted(existing, ts).clip(max=len(existing) - 1)
+                keep &= existing[hits] != ts
+            return self.extend(ts[keep], np.asarray(readings)[keep], np.asarray(period_codes)[keep],
+                               None if notes is None else np.asarray(notes, dtype=object)[keep])
+
+    def _notify(self, positions):
+        for listener in self._listeners:
+            listener(positions)
+
+    # Column views over the live rows (no copies)
+    @property
+    def timestamps(self):
+        return self._ts[:self._size]
+
+    @property
+    def readings(self):
+        return self._reading[:self._size]
+
+    @property
+    def period_codes(self):
+        return self._period[:self._size]
+
+    @property
+    def bucket_codes(self):
+        return PERIOD_BUCKET[self.period_codes]
+
+    @property
+    def notes(self):
+        return self._notes[:self._size]
+
+    def last(self):
+        """Return the most recent reading by timestamp as a dict, or None."""
+        if not self._size:
+            return None
+        return self.row(self._size - 1)
+
+    def row(self, i):
+        return {
+            'Timestamp': self._ts[i].astype("datetime64[us]").item(),
+            'Reading': int(self._reading[i]),
+            'Period': PERIODS[self._period[i]],
+            'Notes': self._notes[i],
+        }
+
+    def bounds(self, start=None, end=None):
+        """Return the ``[lo, hi)`` row range with ``start <= timestamp < end``.
+
+        Both ends are found by binary search on the sorted timestamps.
+        """
+        ts = self.timestamps
+        lo = 0 if start is None else int(np.searchsorted(ts, to_datetime64(start), "left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, to_datetime64(end), "left"))
+        return lo, max(lo, hi)
+
+    def to_frame(self):
+        """Return the history as a DataFrame on a sorted DatetimeIndex, cached per version."""
+        if self._frame_version != self.version:
+            self._frame = self.frame(0, len(self))
+            self._frame_version = self.version
+        return self._frame
+
+    def frame(self, lo, hi):
+        """Build a DataFrame of rows ``lo:hi`` straight from the column arrays (uncached)."""
+        # pandas is only loaded by the views that build frames, not by logging or the dashboard
+        import pandas as pd
+
+        return pd.DataFrame({
+            'Reading': self._reading[lo:hi],
+            'Period': pd.Categorical.from_codes(self._period[lo:hi], categories=PERIODS),
+            'Notes': self._notes[lo:hi],
+        }, index=pd.DatetimeIndex(self._ts[lo:hi], name='Timestamp'))
+
+    def window(self, start=None, end=None):
+        """Return the rows with ``start <= timestamp < end`` as a slice of ``to_frame()``."""
+        lo, hi = self.bounds(start, end)
+        return self.to_frame().iloc[lo:hi]
+
+    def recent(self, n=5):
+        """Return the ``n`` most recent readings as ``row()`` dicts, newest first."""
+        return [self.row(i) for i in range(self._size - 1, max(self._size - n, 0) - 1, -1)]
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from glucose_store import MAX_READING, MIN_READING, PERIODS, infer_period
+from perf import timed
+
+MMOL_TO_MGDL = 18.016
+
+# Accepted column headers, lowercased: the app's own export plus the common
+# meter / CGM export layouts.
+TIMESTAMP_COLUMNS = ["timestamp", "device timestamp", "timestamp (yyyy-mm-ddthh:mm:ss)", "datetime", "date time"]
+DATE_COLUMNS = ["date"]
+TIME_COLUMNS = ["time"]
+READING_COLUMNS = ["reading", "glucose", "glucose value (mg/dl)", "historic glucose mg/dl", "scan glucose mg/dl",
+                   "glucose (mg/dl)", "bg", "sensor glucose (mg/dl)"]
+MMOL_READING_COLUMNS = ["glucose value (mmol/l)", "historic glucose mmol/l", "scan glucose mmol/l",
+                        "glucose (mmol/l)", "sensor glucose (mmol/l)"]
+PERIOD_COLUMNS = ["period", "time period"]
+NOTES_COLUMNS = ["notes", "note", "comment", "comments"]
+
+# Free-text period labels besides the exact selectbox values
+PERIOD_ALIASES = {
+    "morning": 0, "before breakfast": 0, "fasting": 0, "after breakfast": 1,
+    "afternoon": 2, "before lunch": 2, "after lunch": 3,
+    "evening": 4, "before dinner": 4, "after dinner": 5,
+    "bedtime": 6, "night": 6, "overnight": 6,
+    "other": 7,
+}
+_PERIOD_LOOKUP = {**PERIOD_ALIASES, **{name.lower(): code for code, name in enumerate(PERIODS)}}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _find(columns, candidates):
+    lowered = {c.strip().lower(): c for c in columns}
+    return next((lowered[c] for c in candidates if c in lowered), None)
+
+
+def _resolve_columns(columns):
+    layout = {
+        'timestamp': _find(columns, TIMESTAMP_COLUMNS),
+        'date': _find(columns, DATE_COLUMNS),
+        'time': _find(columns, TIME_COLUMNS),
+        'reading': _find(columns, READING_COLUMNS),
+        'reading_mmol': _find(columns, MMOL_READING_COLUMNS),
+        'period': _find(columns, PERIOD_COLUMNS),
+        'notes': _find(columns, NOTES_COLUMNS),
+    }
+    if not (layout['timestamp'] or layout['date']):
+        raise ValueError("CSV needs a timestamp column (e.g. 'Timestamp') or a 'Date' column")
+    if not (layout['reading'] or layout['reading_mmol']):
+        raise ValueError("CSV needs a glucose column (e.g. 'Reading' or 'Glucose')")
+    return layout
+
+
+def normalize_chunk(chunk, layout):
+    """Validate and normalize one parsed chunk with vectorized operations.
+
+    Returns ``(timestamps, readings, period_codes, notes, rejected)``: the
+    columns of the valid rows and the number of rows dropped as invalid.
+    """
+    if layout['timestamp']:
+        raw_ts = chunk[layout['timestamp']].astype("string")
+    else:
+        raw_ts = chunk[layout['date']].astype("string")
+        if layout['time']:
+            raw_ts = raw_ts + " " + chunk[layout['time']].astype("string").fillna("00:00")
+    # Parse with the format inferred from the first row, then retry the rows
+    # that did not match it one by one
+    ts = pd.to_datetime(raw_ts, errors="coerce")
+    retry = ts.isna() & raw_ts.notna()
+    if retry.any():
+        ts[retry] = pd.to_datetime(raw_ts[retry], errors="coerce", format="mixed")
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_localize(None)
+
+    if layout['reading']:
+        readings = pd.to_numeric(chunk[layout['reading']], errors="coerce")
+    else:
+        readings = pd.to_numeric(chunk[layout['reading_mmol']], errors="coerce") * MMOL_TO_MGDL
+    readings = readings.round()
+
+    valid = (ts.notna() & readings.between(MIN_READING, MAX_READING)).to_numpy()
+    ts = ts.to_numpy(dtype="datetime64[ns]")[valid]
+    readings = readings.to_numpy()[valid].astype(np.int16)
+
+    if layout['period']:
+        labels = chunk[layout['period']].astype("category")
+        # Map each distinct label once; the trailing -1 catches missing labels (category code -1)
+        lookup = [_PERIOD_LOOKUP.get(str(c).strip().lower(), -1) for c in labels.cat.categories]
+        codes = np.asarray(lookup + [-1], dtype=np.int8)[labels.cat.codes.to_numpy()][valid]
+        unknown = codes < 0
+        if unknown.any():
+            codes[unknown] = infer_period(ts[unknown])
+    else:
+        codes = infer_period(ts)
+
+    if layout['notes']:
+        notes = chunk[layout['notes']].fillna("").astype(str).to_numpy(dtype=object)[valid]
+    else:
+        notes = np.full(len(ts), "", dtype=object)
+    return ts, readings, codes, notes, int((~valid).sum())
+
+
+@timed("import.csv")
+def import_csv(store, source, chunksize=100_000):
+    """Stream a CSV export into ``store`` and return an ``ImportResult``.
+
+    The file is parsed ``chunksize`` rows at a time, each chunk is validated
+    and normalized with vectorized operations, and all valid rows go to a
+    single ``store.extend_new()``, which drops rows whose timestamp is already
+    in the history or earlier in the file (counted in ``duplicates``) and
+    inserts the rest in one pass.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    parts = []
+    layout = None
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, skipinitialspace=True):
+        if layout is None:
+            layout = _resolve_columns(chunk.columns)
+        result.rows += len(chunk)
+        *columns, invalid = normalize_chunk(chunk, layout)
+        result.invalid += invalid
+        parts.append(columns)
+
+    if parts:
+        ts, readings, codes, notes = (np.concatenate(column) for column in zip(*parts))
+        # Keep the first row per timestamp, and drop timestamps already in the history
+        result.imported = len(store.extend_new(ts, readings, codes, notes))
+        result.duplicates = len(ts) - result.imported
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,259 @@
+import collections
+import hmac
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from glucose_store import MAX_READING, MIN_READING, PERIODS, infer_period
+from perf import recorder
+
+# Readings waiting to be written, across all users; a POST that doesn't fit is refused with 503
+QUEUE_SIZE = 20_000
+# Readings accepted in one POST: a day of 5-minute CGM readings
+MAX_POST = 288
+# Largest request body read, in bytes: MAX_POST readings with their period names fit in well under half of it
+MAX_BODY = 64 * 1024
+# The writer flushes once this many readings are waiting, or FLUSH_INTERVAL seconds after the first arrived
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 0.2
+# Seconds a refused device is asked to wait before sending again
+RETRY_AFTER = 1
+
+_PERIOD_CODES = {name: code for code, name in enumerate(PERIODS)}
+
+
+class IngestQueue:
+    """Bounded FIFO of posted batches, sized in readings rather than batches.
+
+    ``offer()`` never blocks: a batch that would take the queue past
+    ``capacity`` is refused, so a burst of devices gets pushed back instead
+    of piling up memory or stalling the HTTP threads.
+    """
+
+    def __init__(self, capacity=QUEUE_SIZE):
+        self.capacity = capacity
+        self.size = 0
+        self._batches = collections.deque()
+        self._ready = threading.Condition()
+
+    def offer(self, batch, readings):
+        with self._ready:
+            if self.size + readings > self.capacity:
+                return False
+            self._batches.append((batch, readings))
+            self.size += readings
+            self._ready.notify()
+            return True
+
+    def take(self, batch_size=BATCH_SIZE, linger=FLUSH_INTERVAL, timeout=0.5):
+        """Wait for batches and return all of them once ``batch_size`` readings or ``linger`` seconds have passed.
+
+        Returns an empty list if nothing arrives within ``timeout`` seconds.
+        """
+        with self._ready:
+            if not self._ready.wait_for(lambda: self.size, timeout):
+                return []
+            deadline = time.monotonic() + linger
+            while self.size < batch_size and (remaining := deadline - time.monotonic()) > 0:
+                self._ready.wait(remaining)
+            batches = [batch for batch, _ in self._batches]
+            self._batches.clear()
+            self.size = 0
+            return batches
+
+
+def parse_readings(payload):
+    """Validate a posted payload and return ``(user, timestamps, readings, period_codes, invalid)``.
+
+    The payload is ``{"user": name, "readings": [{"time": ISO 8601, "value": mg/dL, "period": optional}]}``.
+    Times with an offset are converted to local time, as the app logs
+    readings; a missing or unknown period is inferred from the time of day.
+    Readings outside the valid range or with an unreadable time are counted
+    in ``invalid`` and dropped. Raises ``ValueError`` for a malformed payload.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("user"), str) or not payload["user"].strip():
+        raise ValueError("Payload needs a 'user'")
+    items = payload.get("readings")
+    if not isinstance(items, list):
+        raise ValueError("Payload needs a 'readings' list")
+    if len(items) > MAX_POST:
+        raise ValueError(f"At most {MAX_POST} readings per request")
+    times, values, codes = [], [], []
+    for item in items:
+        try:
+            moment = datetime.fromisoformat(item["time"])
+            value = round(float(item["value"]))
+        except (TypeError, KeyError, ValueError, OverflowError):
+            continue
+        if not MIN_READING <= value <= MAX_READING:
+            continue
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+        times.append(moment)
+        values.append(value)
+        period = item.get("period")
+        codes.append(_PERIOD_CODES.get(period, -1) if isinstance(period, str) else -1)
+    ts = np.array(times, dtype="datetime64[ns]")
+    codes = np.array(codes, dtype=np.int8)
+    unknown = codes < 0
+    if unknown.any():
+        codes[unknown] = infer_period(ts[unknown])
+    return payload["user"].strip(), ts, np.array(values, dtype=np.int16), codes, len(items) - len(times)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self._send(404, {"error": "Not found"})
+            return
+        self._send(200, self.server.ingest.status())
+
+    def do_POST(self):
+        ingest = self.server.ingest
+        if self.path.rstrip("/") != "/readings":
+            self._send(404, {"error": "Not found"})
+            return
+        if ingest.token and not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {ingest.token}"):
+            self._send(401, {"error": "Missing or wrong token"})
+            return
+        # Check the declared length before reading: a negative one would block until the client hangs up
+        # and an oversized one would be read into memory whole
+        length = self.headers.get("Content-Length", "")
+        if not length.isdigit():
+            self._send(400, {"error": "A valid Content-Length is required"})
+            return
+        if int(length) > MAX_BODY:
+            self._send(413, {"error": f"Request body over {MAX_BODY} bytes"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(length)) or b"null")
+            user, ts, readings, codes, invalid = parse_readings(payload)
+        except ValueError as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        if not ingest.submit(user, ts, readings, codes, invalid):
+            self._send(503, {"error": "Ingest queue full", "retry_after": RETRY_AFTER},
+                       {"Retry-After": str(RETRY_AFTER)})
+            return
+        self._send(202, {"accepted": len(ts), "invalid": invalid, "queued": ingest.queue.size})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Devices reconnecting together (e.g. after the app restarts) would overflow the default backlog of 5
+    request_queue_size = 256
+
+
+class IngestServer:
+    """Local HTTP receiver for continuous glucose monitor readings.
+
+    Devices (or a bridge from the CGM vendor's app) ``POST /readings`` with
+    a JSON payload (see ``parse_readings``); ``GET /health`` reports the
+    queue and counters. Accepted readings wait in a bounded ``IngestQueue``
+    and the POST is answered 202 at once; when the queue is full the POST
+    gets 503 with ``Retry-After``, so devices back off and resend rather
+    than the app buffering without limit. A single writer thread drains the
+    queue in batches and writes each user's readings with one
+    ``GlucoseStore.extend_new()``, which also drops readings a device sends
+    again, so the statistics, indexes and alert engine see one insert per
+    user per batch instead of one per reading.
+
+    With a ``token``, POSTs must send ``Authorization: Bearer <token>``.
+    """
+
+    def __init__(self, service, host="127.0.0.1", port=8766, token=None, capacity=QUEUE_SIZE):
+        self.service = service
+        self.token = token
+        self.queue = IngestQueue(capacity)
+        self.received = 0
+        self.refused = 0
+        self.invalid = 0
+        self.written = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._http = _Server((host, port), _Handler)
+        self._http.ingest = self
+        self.address = self._http.server_address[:2]
+        self._threads = [threading.Thread(target=self._http.serve_forever, daemon=True),
+                         threading.Thread(target=self._write_loop, daemon=True)]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """Stop accepting readings and write the ones still queued."""
+        self._http.shutdown()
+        self._http.server_close()
+        self._stop.set()
+        self._threads[1].join()
+
+    def submit(self, user, timestamps, readings, period_codes, invalid=0):
+        """Queue one user's readings for the writer; False if the queue is full."""
+        accepted = self.queue.offer((user, timestamps, readings, period_codes), len(timestamps))
+        with self._lock:
+            self.invalid += invalid
+            if accepted:
+                self.received += len(timestamps)
+            else:
+                self.refused += len(timestamps)
+        return accepted
+
+    def _write_loop(self):
+        while not self._stop.is_set() or self.queue.size:
+            batches = self.queue.take(timeout=0.1 if self._stop.is_set() else 0.5)
+            if batches:
+                self.write(batches)
+
+    def write(self, batches):
+        """Write queued batches, grouped per user, into the users' stores."""
+        started = time.perf_counter()
+        per_user = collections.defaultdict(list)
+        for user, *columns in batches:
+            per_user[user].append(columns)
+        for user, parts in per_user.items():
+            ts, readings, codes = (np.concatenate(column) for column in zip(*parts))
+            try:
+                written = len(self.service.user(user).store.extend_new(ts, readings, codes))
+            except Exception:
+                # One user's storage failing (disk full, bad directory) must not stop the others' readings
+                self.write_errors += 1
+                continue
+            self.written += written
+            self.duplicates += len(ts) - written
+        self.flushes += 1
+        recorder.record("ingest.flush", time.perf_counter() - started)
+
+    def status(self):
+        return {
+            "queued": self.queue.size,
+            "capacity": self.queue.capacity,
+            "received": self.received,
+            "refused": self.refused,
+            "invalid": self.invalid,
+            "written": self.written,
+            "duplicates": self.duplicates,
+            "flushes": self.flushes,
+            "write_errors": self.write_errors,
+        }
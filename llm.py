@@ -0,0 +1,225 @@
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import openai
+from openai import AsyncOpenAI
+
+from perf import recorder
+
+DEFAULT_BASE_URL = "https://api.studio.nebius.com/v1/"
+MODEL = "microsoft/phi-4"
+
+# Errors worth retrying as long as no tokens have been delivered yet
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for coroutines on a single event loop."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Flight:
+    """One upstream request and the callers waiting on its tokens."""
+
+    def __init__(self):
+        self.chunks = []
+        self.listeners = set()
+        self.task = None
+
+    def publish(self, item):
+        for listener in self.listeners:
+            listener.put(item)
+
+
+class CompletionWorker:
+    """Shared gateway that streams chat completions from a background event loop.
+
+    A single daemon thread runs the loop and an ``AsyncOpenAI`` client for
+    every session in the process. Requests pass through, in order:
+
+    - coalescing: identical in-flight requests share one upstream call, and
+      late joiners are replayed the tokens received so far;
+    - a concurrency limit, which also caps the connections the client's
+      pool opens since each request holds at most one;
+    - a token-bucket rate limiter;
+    - exponential-backoff retries (with jitter) on rate-limit, timeout,
+      connection and 5xx errors, as long as no tokens were delivered yet.
+
+    ``stream()`` hands tokens back to the calling thread as they arrive and
+    ``metrics()`` reports queue depth, wait times and counters.
+    """
+
+    def __init__(self, base_url=None, api_key=None, max_concurrency=8, rate=5.0, burst=10, max_retries=3,
+                 backoff_base=0.5, backoff_cap=8.0):
+        self.client = AsyncOpenAI(
+            base_url=base_url or os.environ.get("NEBIUS_BASE_URL", DEFAULT_BASE_URL),
+            api_key=api_key,
+            max_retries=0
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._bucket = TokenBucket(rate, burst)
+        self._flights = {}
+        self._waits = collections.deque(maxlen=1000)
+        self._counters = collections.Counter()
+        self._queued = 0
+        self._in_flight = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-worker", daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(max_concurrency),
+                                                           self._loop).result()
+
+    @staticmethod
+    async def _make_semaphore(value):
+        return asyncio.Semaphore(value)
+
+    def stream(self, messages, model=MODEL, temperature=0.3):
+        """Yield the completion text chunk by chunk.
+
+        Errors from the API are re-raised in the caller's thread. Closing the
+        generator early (e.g. when Streamlit stops the script) detaches the
+        caller, and the upstream request is cancelled once nobody is left
+        listening.
+        """
+        params = {"model": model, "temperature": temperature}
+        key = hashlib.sha256(json.dumps([messages, params], sort_keys=True).encode()).hexdigest()
+        tokens = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._subscribe(key, tokens, messages, params), self._loop).result()
+        try:
+            while True:
+                item = tokens.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._loop.call_soon_threadsafe(self._unsubscribe, key, tokens)
+
+    def complete(self, messages, **params):
+        """Return the whole completion text."""
+        return "".join(self.stream(messages, **params))
+
+    def metrics(self):
+        """Return gateway counters, current queue depth and recent wait times (seconds)."""
+        waits = sorted(self._waits)
+
+        def pct(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+
+        return {
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "requests": self._counters["requests"],
+            "upstream": self._counters["upstream"],
+            "coalesced": self._counters["coalesced"],
+            "retries": self._counters["retries"],
+            "failures": self._counters["failures"],
+            "wait_p50": pct(0.5),
+            "wait_p95": pct(0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+    async def _subscribe(self, key, tokens, messages, params):
+        self._counters["requests"] += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = self._loop.create_task(self._run(key, flight, messages, params))
+        else:
+            self._counters["coalesced"] += 1
+            for chunk in flight.chunks:
+                tokens.put(chunk)
+        flight.listeners.add(tokens)
+
+    def _unsubscribe(self, key, tokens):
+        flight = self._flights.get(key)
+        if flight is not None and tokens in flight.listeners:
+            flight.listeners.discard(tokens)
+            if not flight.listeners:
+                # Forget the flight now rather than when the task unwinds, so a caller arriving in between
+                # starts a new request instead of joining one that ends after partial output
+                del self._flights[key]
+                flight.task.cancel()
+
+    async def _run(self, key, flight, messages, params):
+        submitted = time.monotonic()
+        self._queued += 1
+        waiting = True
+        try:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self._queued -= 1
+                waiting = False
+                self._waits.append(time.monotonic() - submitted)
+                recorder.record("llm.wait", self._waits[-1])
+                self._in_flight += 1
+                try:
+                    await self._request(flight, messages, params)
+                finally:
+                    self._in_flight -= 1
+        except Exception as e:
+            self._counters["failures"] += 1
+            flight.publish(_Failure(e))
+        finally:
+            if waiting:
+                self._queued -= 1
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.publish(_DONE)
+
+    async def _request(self, flight, messages, params):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._counters["upstream"] += 1
+                started = time.perf_counter()
+                response = await self.client.chat.completions.create(messages=messages, stream=True, **params)
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not flight.chunks:
+                            recorder.record("llm.first_token", time.perf_counter() - started)
+                        text = chunk.choices[0].delta.content
+                        flight.chunks.append(text)
+                        flight.publish(text)
+                recorder.record("llm.request", time.perf_counter() - started)
+                return
+            except RETRYABLE_ERRORS:
+                if flight.chunks or attempt == self.max_retries:
+                    raise
+                self._counters["retries"] += 1
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                await self._bucket.acquire()
@@ -1,323 +1,228 @@
 import os
+import time
 import streamlit as st
-import pandas as pd
 
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from openai import OpenAI
+from itertools import chain
+from pathlib import Path
 from dotenv import load_dotenv
 
+from glucose_store import PERIODS, MIN_READING, MAX_READING, split_by_bucket
+from glucose_patterns import format_summary, pattern_summary, summary_key
+from alerts import JsonlAlertSink
+from data_service import DIABETES_TYPES, DataService
+from ingest import IngestServer
+from range_index import box_summary
+from exporter import FORMATS, ExportCache, available_formats
+from food_lexicon import FoodLexicon
+from nutrition import FoodTable, plan_key, plan_markdown, plan_meals
+from perf import recorder, span, timed
+from rec_archive import PAGE_SIZE, heading
+from rec_cache import RecommendationCache, recommendation_key
+
+# pandas, Plotly (charts), the OpenAI client (llm) and the CSV importer are imported inside the pages and
+# resources that use them, so a cold start that only opens Log Glucose doesn't load them
+
+rerun_started = time.perf_counter()
+
 # Page configuration
 st.set_page_config(
     page_title="Gluco Guide - AI Diabetes Assistant",
     page_icon="🩸",
     layout="wide"
 )
-st.markdown("""
-<style>
-    /* Color Palette */
-    :root {
-        --primary: #4f46e5;       /* Rich indigo - main app color */
-        --primary-light: #ede9fe; /* Light indigo background */
-        --secondary: #10b981;     /* Emerald green for success states */
-        --secondary-light: #d1fae5; /* Light green background */
-        --warning: #f59e0b;       /* Amber for warnings/alerts */
-        --warning-light: #fef3c7; /* Light amber background */
-        --neutral-dark: #1f2937;  /* Dark gray for text */
-        --neutral-medium: #6b7280; /* Medium gray for secondary text */
-        --neutral-light: #f9fafb; /* Light gray for backgrounds */
-        --white: #ffffff;         /* White */
-        --shadow: rgba(0, 0, 0, 0.08); /* Shadow color */
-    }
-
-    /* Typography */
-    body {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-        color: var(--neutral-dark);
-        line-height: 1.6;
-    }
-
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: var(--primary);
-        text-align: center;
-        margin-bottom: 1.5rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 2px solid var(--primary-light);
-    }
-
-    .sub-header {
-        font-size: 1.5rem;
-        font-weight: 600;
-        color: var(--primary);
-        margin-top: 1.5rem;
-        margin-bottom: 1rem;
-    }
+# Stylesheet and logo are static files: with static serving on (.streamlit/config.toml) each run sends a link
+# and the browser fetches them once; otherwise the stylesheet is inlined
+static_serving = st.get_option("server.enableStaticServing")
+if static_serving:
+    st.html('<style>@import url("app/static/style.css");</style>')
+else:
+    st.html(Path("static/style.css"))
 
-    /* Card Components */
-    .metric-card {
-        background-color: var(--white);
-        padding: 1.25rem;
-        border-radius: 12px;
-        box-shadow: 0 4px 12px var(--shadow);
-        transition: transform 0.2s ease;
-        text-align: center;
-        border-top: 4px solid var(--primary);
-    }
-
-    .metric-card:hover {
-        transform: translateY(-2px);
-    }
-
-    .metric-card h3 {
-        color: var(--neutral-medium);
-        font-size: 1rem;
-        font-weight: 500;
-        margin-bottom: 0.5rem;
-    }
+load_dotenv()
 
-    .metric-card h2 {
-        color: var(--primary);
-        font-size: 2rem;
-        font-weight: 700;
-        margin: 0.5rem 0;
-    }
+# GLUCO_ADMIN=1 adds the Performance page with timings of the instrumented code paths
+show_admin = os.environ.get("GLUCO_ADMIN", "").lower() in ("1", "true", "yes")
 
-    /* Information Boxes */
-    .info-box {
-        background-color: var(--primary-light);
-        padding: 1.25rem;
-        border-radius: 12px;
-        border-left: 5px solid var(--primary);
-        margin-bottom: 1.25rem;
-        font-size: 0.95rem;
-    }
 
-    .disclaimer {
-        background-color: var(--warning-light);
-        padding: 1rem;
-        border-radius: 12px;
-        border-left: 5px solid var(--warning);
-        font-size: 0.9rem;
-        margin-top: 2rem;
-    }
+# Per-user readings, statistics, profile and recommendations, opened once per process and shared by
+# every rerun and session; a session only keeps the user's name
+@st.cache_resource
+def get_data_service():
+    # GLUCO_ALERT_LOG=path also appends every alert to that file as JSON lines
+    alert_log = os.environ.get("GLUCO_ALERT_LOG")
+    return DataService(alert_sinks=[JsonlAlertSink(alert_log)] if alert_log else [])
 
-    .recommendation-box {
-        background-color: var(--secondary-light);
-        padding: 1.5rem;
-        border-radius: 12px;
-        border-left: 5px solid var(--secondary);
-        margin-top: 1.25rem;
-        box-shadow: 0 2px 8px var(--shadow);
-    }
 
-    /* Sidebar Styling */
-    .sidebar-content {
-        padding: 1.5rem 1rem;
-        background-color: var(--primary-light);
-        border-radius: 12px;
-        margin-bottom: 1rem;
-    }
+# GLUCO_INGEST_PORT=port starts a receiver for live CGM readings in this server process (bound to
+# GLUCO_INGEST_HOST, default 127.0.0.1; GLUCO_INGEST_TOKEN requires a bearer token) and the Dashboard's cards and
+# trend refresh themselves every LIVE_REFRESH seconds
+ingest_port = os.environ.get("GLUCO_INGEST_PORT")
+LIVE_REFRESH = 5
 
-    .sidebar-content h3 {
-        color: var(--primary);
-        border-bottom: 1px solid var(--primary);
-        padding-bottom: 0.5rem;
-        margin-bottom: 1rem;
-    }
 
-    /* Button Styling */
-    .stButton>button {
-        background-color: var(--primary);
-        color: white;
-        border-radius: 8px;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        transition: all 0.2s ease;
-    }
+@st.cache_resource
+def get_ingest_server():
+    return IngestServer(get_data_service(), host=os.environ.get("GLUCO_INGEST_HOST", "127.0.0.1"),
+                        port=int(ingest_port), token=os.environ.get("GLUCO_INGEST_TOKEN")).start()
 
-    .stButton>button:hover {
-        background-color: var(--primary);
-        opacity: 0.9;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px var(--shadow);
-    }
 
-    /* Form Controls */
-    input, select, textarea {
-        border-radius: 8px !important;
-        border: 1px solid #e2e8f0 !important;
-    }
+if ingest_port:
+    get_ingest_server()
 
-    input:focus, select:focus, textarea:focus {
-        border-color: var(--primary) !important;
-        box-shadow: 0 0 0 2px var(--primary-light) !important;
-    }
 
-    /* Tabs styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-    }
+# History aggregates for a date range from the user's range index, memoized per user key, history version,
+# range and target range with LRU eviction (the leading underscore keeps the index itself out of the memo key)
+@st.cache_data(max_entries=64, show_spinner=False)
+def history_statistics(user, version, start, end, target_range, _index):
+    with span("history.query"):
+        window = _index.aggregate(start, end)
+        if not window.count:
+            return None
 
-    .stTabs [data-baseweb="tab"] {
-        border-radius: 8px 8px 0 0;
-        padding: 8px 16px;
-        background-color: var(--neutral-light);
-    }
+        boxes = {}
+        for bucket in ["Morning", "Afternoon", "Evening"]:
+            bucket_window = _index.aggregate(start, end, bucket=bucket)
+            if bucket_window.count:
+                boxes[bucket] = box_summary(bucket_window)
 
-    .stTabs [aria-selected="true"] {
-        background-color: var(--primary);
-        color: white;
+    return {
+        'count': window.count,
+        'mean': window.mean,
+        'median': window.median,
+        'std': window.std or 0.0,
+        'q1': window.quantile(0.25),
+        'q3': window.quantile(0.75),
+        'min': window.min,
+        'max': window.max,
+        'in_range': window.in_range(*target_range),
+        'period_means': window.bucket_means(["Morning", "Afternoon", "Evening"]),
+        'boxes': boxes,
     }
 
-    /* Table Styling */
-    .stDataFrame {
-        border-radius: 12px;
-        overflow: hidden;
-        border: 1px solid #e2e8f0;
-    }
 
-    .stDataFrame [data-testid="stTable"] {
-        border-collapse: separate;
-        border-spacing: 0;
-    }
+# Initialize Nebius API client
+@st.cache_resource
+def get_client():
+    from llm import CompletionWorker
 
-    .stDataFrame th {
-        background-color: var(--primary-light);
-        color: var(--primary);
-        padding: 12px 8px;
-        font-weight: 600;
-    }
+    return CompletionWorker(api_key=os.environ.get("NEBIUS_API_KEY"))
 
-    .stDataFrame td {
-        padding: 8px;
-        border-top: 1px solid #e2e8f0;
-    }
 
-    /* Chart Container */
-    [data-testid="stPlotlyChart"] > div {
-        border-radius: 12px;
-        background-color: white;
-        box-shadow: 0 2px 8px var(--shadow);
-        padding: 1rem;
-    }
+# Recommendation cache shared by every session, backed by a local SQLite file
+@st.cache_resource
+def get_recommendation_cache():
+    return RecommendationCache()
 
-    /* Reading Log Items */
-    .log-item {
-        background-color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 0.75rem;
-        box-shadow: 0 2px 4px var(--shadow);
-        border-left: 4px solid var(--primary);
-        transition: transform 0.2s ease;
-    }
 
-    .log-item:hover {
-        transform: translateX(2px);
-    }
+recommendation_cache = get_recommendation_cache()
 
-    .log-high {
-        border-left-color: #ef4444;
-    }
 
-    .log-normal {
-        border-left-color: var(--secondary);
-    }
-
-    .log-low {
-        border-left-color: var(--warning);
-    }
+# Food table the Meal Planner scores meals from, loaded once per process
+@st.cache_resource
+def get_food_table():
+    return FoodTable.load()
 
-    /* Glucose value styling */
-    .glucose-value {
-        font-size: 1.3rem;
-        font-weight: 700;
-        padding: 0.25rem 0.5rem;
-        border-radius: 6px;
-    }
 
-    .glucose-high {
-        color: #ef4444;
-        background-color: #fee2e2;
-    }
+# Names and synonyms of the table's foods, for reading the foods the user would like to eat
+@st.cache_resource
+def get_food_lexicon():
+    return FoodLexicon.from_table(get_food_table())
 
-    .glucose-normal {
-        color: var(--secondary);
-        background-color: var(--secondary-light);
-    }
 
-    .glucose-low {
-        color: var(--warning);
-        background-color: var(--warning-light);
-    }
-</style>
-""", unsafe_allow_html=True)
-# Initialize session state for storing history
-if 'glucose_history' not in st.session_state:
-    st.session_state.glucose_history = pd.DataFrame(columns=['Date', 'Time', 'Reading', 'Period'])
+@st.cache_resource
+def get_export_cache():
+    return ExportCache()
 
-if 'recommendations_history' not in st.session_state:
-    st.session_state.recommendations_history = []
 
-load_dotenv()
-# Initialize Nebius API client
+# Built Plotly figures shared by every rerun and session, evicted least recently used past 64 MB
 @st.cache_resource
-def get_client():
-    return OpenAI(
-        base_url="https://api.studio.nebius.com/v1/",
-        api_key=os.environ.get("NEBIUS_API_KEY")
-    )
+def get_figure_cache():
+    from charts import FigureCache
+
+    return FigureCache()
 
 
-client = get_client()
+def cached_figure(page, chart, build, *view):
+    """Return a chart built by ``build()``, reused until the history, target range or ``view`` change."""
+    key = (user.key, history.version, tuple(st.session_state.target_range),
+           page, chart) + view
+    return get_figure_cache().get(key, build)
 
 # Sidebar for navigation and user profile
 with st.sidebar:
     st.markdown("<div class='sidebar-content'>", unsafe_allow_html=True)
-    st.image("Red Circle Health Logo.png", width=300)
+    if static_serving:
+        st.markdown('<img src="app/static/red-circle-health-logo.png" width="300">', unsafe_allow_html=True)
+    else:
+        st.image("static/red-circle-health-logo.png", width=300)
     st.markdown("### User Profile")
 
     if 'user_name' not in st.session_state:
         st.session_state.user_name = ""
-        st.session_state.diabetes_type = ""
-        st.session_state.target_range = [80, 130]
 
     user_name = st.text_input("Name", value=st.session_state.user_name)
-    diabetes_type = st.selectbox("Diabetes Type",
-                                 ["Type 1", "Type 2", "Gestational", "Pre-diabetes"],
-                                 index=1 if st.session_state.diabetes_type == "Type 2" else 0)
+    if user_name:
+        st.session_state.user_name = user_name
+    if st.session_state.user_name.strip():
+        user = get_data_service().user(st.session_state.user_name)
+        # Names differing only in case, spaces or punctuation open the same profile
+        if user.profile['name'] != st.session_state.user_name.strip():
+            st.info(f"Opened the existing profile \"{user.profile['name']}\": names that differ only in case, "
+                    f"spaces or punctuation share a profile.")
+    else:
+        # Without a name the session gets a history of its own, kept in memory only
+        if 'guest' not in st.session_state:
+            st.session_state.guest = get_data_service().guest()
+        user = st.session_state.guest
+        st.caption("Enter your name to keep your readings; without one they last only for this session.")
+
+    # Profile widgets start from the user's saved profile and write changes back to it
+    saved_type = user.profile['diabetes_type']
+    diabetes_type = st.selectbox("Diabetes Type", DIABETES_TYPES,
+                                 index=DIABETES_TYPES.index(saved_type) if saved_type in DIABETES_TYPES else 0)
 
     st.markdown("### Target Glucose Range (mg/dL)")
-    target_min, target_max = st.slider("", 70, 200, st.session_state.target_range, 5)
+    target_min, target_max = st.slider("", 70, 200, user.profile['target_range'], 5)
 
-    if user_name:
-        st.session_state.user_name = user_name
-    if diabetes_type:
-        st.session_state.diabetes_type = diabetes_type
+    user.update_profile(diabetes_type=diabetes_type, target_range=[target_min, target_max])
+    st.session_state.diabetes_type = diabetes_type
     st.session_state.target_range = [target_min, target_max]
 
     st.markdown("### Navigation")
-    app_mode = st.radio("", ["Log Glucose", "Meal Planner","Dashboard","History"])
+    pages = ["Log Glucose", "Meal Planner","Dashboard","History"]
+    if show_admin:
+        pages.append("Performance")
+    app_mode = st.radio("", pages)
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Main app
-st.markdown("<h1 class='main-header'>Gluco Guide - AI-Powered Diabetes Assistant</h1>", unsafe_allow_html=True)
+history = user.store
+stats = user.stats
+
+
+# Alerts from the rule engine, styled by severity
+def show_alert(alert):
+    show = {"urgent": st.error, "warning": st.warning}.get(alert['severity'], st.info)
+    show(f"{alert['time']:%Y-%m-%d %H:%M} · {alert['message']}")
+
+
+# Metric cards, alerts and trend chart: with live ingest on, this part of the Dashboard reruns on its own every
+# LIVE_REFRESH seconds to pick up new CGM readings; the figure is rebuilt only when the history changed
+@st.fragment(run_every=LIVE_REFRESH if ingest_port else None)
+@timed("page.Dashboard.live")
+def live_dashboard():
+    from charts import trend_figure
 
-# Display different sections based on navigation
-if app_mode == "Dashboard":
     # Dashboard layout with columns
     col1, col2, col3 = st.columns(3)
 
     with col1:
         st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
         st.markdown("### Last Reading")
-        if not st.session_state.glucose_history.empty:
-            last_reading = st.session_state.glucose_history.iloc[-1]
+        if not history.empty:
+            last_reading = history.last()
             st.markdown(f"<h2>{last_reading['Reading']} mg/dL</h2>", unsafe_allow_html=True)
-            st.markdown(f"{last_reading['Period']} - {last_reading['Time']}")
+            st.markdown(f"{last_reading['Period']} - {last_reading['Timestamp']:%Y-%m-%d %H:%M}")
         else:
             st.markdown("<h2>--</h2>", unsafe_allow_html=True)
             st.markdown("No readings yet")
@@ -326,9 +231,10 @@ if app_mode == "Dashboard":
     with col2:
         st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
         st.markdown("### 7-Day Average")
-        if not st.session_state.glucose_history.empty:
-            avg = st.session_state.glucose_history['Reading'].mean()
-            st.markdown(f"<h2>{avg:.1f} mg/dL</h2>", unsafe_allow_html=True)
+        week = stats.window(7)
+        if week.count:
+            st.markdown(f"<h2>{week.mean:.1f} mg/dL</h2>", unsafe_allow_html=True)
+            st.markdown(f"{week.count} readings in the last 7 days")
         else:
             st.markdown("<h2>--</h2>", unsafe_allow_html=True)
             st.markdown("No data available")
@@ -337,13 +243,9 @@ if app_mode == "Dashboard":
     with col3:
         st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
         st.markdown("### Target Range")
-        in_range = 0
-        total = len(st.session_state.glucose_history)
+        total = stats.overall.count
         if total > 0:
-            in_range = len(st.session_state.glucose_history[
-                               (st.session_state.glucose_history['Reading'] >= st.session_state.target_range[0]) &
-                               (st.session_state.glucose_history['Reading'] <= st.session_state.target_range[1])
-                               ])
+            in_range = stats.overall.in_range(*st.session_state.target_range)
             percentage = (in_range / total) * 100
             st.markdown(f"<h2>{percentage:.1f}%</h2>", unsafe_allow_html=True)
             st.markdown(f"{in_range} of {total} readings in range")
@@ -352,50 +254,19 @@ if app_mode == "Dashboard":
             st.markdown("No data available")
         st.markdown("</div>", unsafe_allow_html=True)
 
-    st.markdown("<h2 class='sub-header'>Glucose Trends</h2>", unsafe_allow_html=True)
-
-    if not st.session_state.glucose_history.empty:
-        # Create a Plotly figure
-        fig = go.Figure()
-
-        # Add the glucose readings
-        fig.add_trace(go.Scatter(
-            x=st.session_state.glucose_history['Date'] + ' ' + st.session_state.glucose_history['Time'],
-            y=st.session_state.glucose_history['Reading'],
-            mode='lines+markers',
-            name='Glucose',
-            marker=dict(size=8, color='#3366cc'),
-            line=dict(width=2, color='#3366cc')
-        ))
+    alerts = user.alerts.recent(5)
+    if alerts:
+        st.markdown("<h2 class='sub-header'>Recent Alerts</h2>", unsafe_allow_html=True)
+        for alert in alerts:
+            show_alert(alert)
 
-        # Add target range as a shaded area
-        fig.add_trace(go.Scatter(
-            x=st.session_state.glucose_history['Date'] + ' ' + st.session_state.glucose_history['Time'],
-            y=[st.session_state.target_range[1]] * len(st.session_state.glucose_history),
-            fill=None,
-            mode='lines',
-            line=dict(width=0),
-            showlegend=False
-        ))
-
-        fig.add_trace(go.Scatter(
-            x=st.session_state.glucose_history['Date'] + ' ' + st.session_state.glucose_history['Time'],
-            y=[st.session_state.target_range[0]] * len(st.session_state.glucose_history),
-            fill='tonexty',
-            mode='lines',
-            line=dict(width=0),
-            fillcolor='rgba(76, 175, 80, 0.2)',
-            name='Target Range'
-        ))
+    st.markdown("<h2 class='sub-header'>Glucose Trends</h2>", unsafe_allow_html=True)
 
-        # Layout configuration
-        fig.update_layout(
-            title='Glucose Readings Over Time',
-            xaxis_title='Date and Time',
-            yaxis_title='Glucose Level (mg/dL)',
-            height=400,
-            margin=dict(l=40, r=40, t=40, b=40),
-            hovermode='closest',
+    if not history.empty:
+        fig = cached_figure("Dashboard", "trend", lambda: trend_figure(
+            history.timestamps,
+            history.readings,
+            st.session_state.target_range,
             legend=dict(
                 orientation="h",
                 yanchor="bottom",
@@ -403,26 +274,39 @@ if app_mode == "Dashboard":
                 xanchor="right",
                 x=1
             )
-        )
+        ))
 
-        st.plotly_chart(fig, use_container_width=True)
+        with span("figure.render"):
+            st.plotly_chart(fig, use_container_width=True)
     else:
         st.markdown(
             "<div class='info-box'>No glucose data available yet. Start logging your readings to see trends.</div>",
             unsafe_allow_html=True)
 
+
+# Each page is a fragment: interacting with a widget on it reruns only that page, not the CSS, sidebar and the
+# rest of the script. Pages read the current user's data through the module-level `user`, `history` and `stats`.
+@st.fragment
+@timed("page.Dashboard")
+def dashboard_page():
+    live_dashboard()
+
     # Recent recommendations
     st.markdown("<h2 class='sub-header'>Recent AI Recommendations</h2>", unsafe_allow_html=True)
-    if st.session_state.recommendations_history:
+    if user.last_recommendation():
         st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
-        st.write(st.session_state.recommendations_history[-1])
+        st.write(user.last_recommendation())
         st.markdown("</div>", unsafe_allow_html=True)
     else:
         st.markdown(
             "<div class='info-box'>No recommendations yet. Use the Meal Planner to get personalized advice.</div>",
             unsafe_allow_html=True)
 
-elif app_mode == "Log Glucose":
+
+
+@st.fragment
+@timed("page.Log Glucose")
+def log_glucose_page():
     st.markdown("<h2 class='sub-header'>Log Your Glucose Readings</h2>", unsafe_allow_html=True)
 
     col1, col2 = st.columns(2)
@@ -430,56 +314,63 @@ elif app_mode == "Log Glucose":
     with col1:
         st.markdown("<div class='info-box'>Regular logging helps identify patterns and improve management.</div>",
                     unsafe_allow_html=True)
-        today = datetime.now().strftime("%Y-%m-%d")
         date = st.date_input("Date", datetime.now())
-        time_period = st.selectbox("Time Period",
-                                   ["Morning (Before Breakfast)",
-                                    "Morning (After Breakfast)",
-                                    "Afternoon (Before Lunch)",
-                                    "Afternoon (After Lunch)",
-                                    "Evening (Before Dinner)",
-                                    "Evening (After Dinner)",
-                                    "Bedtime",
-                                    "Other"])
-
-        current_time = datetime.now().strftime("%H:%M")
+        time_period = st.selectbox("Time Period", PERIODS)
+
         time = st.time_input("Time", datetime.now())
-        reading = st.number_input("Glucose Reading (mg/dL)", min_value=40, max_value=500, step=1, value=120)
+        reading = st.number_input("Glucose Reading (mg/dL)", min_value=MIN_READING, max_value=MAX_READING, step=1,
+                                  value=120)
         notes = st.text_area("Notes (Optional)", placeholder="Exercise, stress, illness, etc.")
 
         if st.button("Save Reading", type="primary"):
-            new_entry = {
-                'Date': date.strftime("%Y-%m-%d"),
-                'Time': time.strftime("%H:%M"),
-                'Reading': reading,
-                'Period': time_period,
-                'Notes': notes
-            }
-
-            st.session_state.glucose_history = pd.concat([
-                st.session_state.glucose_history,
-                pd.DataFrame([new_entry])
-            ], ignore_index=True)
+            seen = user.alerts.sequence
+            history.add(datetime.combine(date, time), reading, time_period, notes)
 
             st.success("Reading saved successfully!")
+            # Alerts the rule engine raised for this reading
+            for alert in user.alerts.since(seen):
+                show_alert(alert)
 
     with col2:
         st.markdown("<h3 class='sub-header'>Recent Readings</h3>", unsafe_allow_html=True)
 
-        if not st.session_state.glucose_history.empty:
-            recent = st.session_state.glucose_history.sort_values(by=['Date', 'Time'], ascending=False).head(5)
-            for _, row in recent.iterrows():
+        if not history.empty:
+            for row in history.recent(5):
+                timestamp = row['Timestamp']
                 st.markdown(f"""
                 <div style="background-color:#f5f5f5; padding:10px; border-radius:5px; margin-bottom:10px;">
-                    <strong>{row['Date']} - {row['Period']}</strong><br>
-                    <span style="font-size:1.2rem;">{row['Reading']} mg/dL</span> at {row['Time']}
-                    {f"<br><em>Notes: {row['Notes']}</em>" if 'Notes' in row and row['Notes'] else ""}
+                    <strong>{timestamp:%Y-%m-%d} - {row['Period']}</strong><br>
+                    <span style="font-size:1.2rem;">{row['Reading']} mg/dL</span> at {timestamp:%H:%M}
+                    {f"<br><em>Notes: {row['Notes']}</em>" if row['Notes'] else ""}
                 </div>
                 """, unsafe_allow_html=True)
         else:
             st.markdown("<div class='info-box'>No readings logged yet.</div>", unsafe_allow_html=True)
 
-elif app_mode == "Meal Planner":
+    # Bulk import of meter / CGM exports
+    st.markdown("<h3 class='sub-header'>Import Readings</h3>", unsafe_allow_html=True)
+    st.markdown(
+        "<div class='info-box'>Upload a CSV export from your meter, CGM or this app. Readings already in your history "
+        "are skipped, and periods missing from the file are inferred from the time of day.</div>",
+        unsafe_allow_html=True)
+    uploaded = st.file_uploader("CSV file", type=["csv"])
+    if uploaded is not None and st.button("Import Readings"):
+        from importer import import_csv
+
+        try:
+            with st.spinner("Importing readings..."):
+                result = import_csv(history, uploaded)
+            st.success(f"Imported {result.imported:,} of {result.rows:,} rows "
+                       f"({result.duplicates:,} duplicates, {result.invalid:,} invalid) "
+                       f"in {result.seconds:.1f}s.")
+        except ValueError as e:
+            st.error(f"Could not import file: {str(e)}")
+
+
+
+@st.fragment
+@timed("page.Meal Planner")
+def meal_planner_page():
     st.markdown("<h2 class='sub-header'>AI Meal Planner & Recommendations</h2>", unsafe_allow_html=True)
 
     col1, col2 = st.columns([1, 1])
@@ -491,13 +382,10 @@ elif app_mode == "Meal Planner":
 
         # Get most recent readings for each period
         recent_readings = {}
-        if not st.session_state.glucose_history.empty:
-            for period in ["Morning", "Afternoon", "Evening"]:
-                period_data = st.session_state.glucose_history[
-                    st.session_state.glucose_history['Period'].str.contains(period)]
-                if not period_data.empty:
-                    latest = period_data.sort_values(by=['Date', 'Time'], ascending=False).iloc[0]
-                    recent_readings[period] = latest['Reading']
+        for period in ["Morning", "Afternoon", "Evening"]:
+            latest = stats.latest(period)
+            if latest is not None:
+                recent_readings[period] = latest
 
         # Display recent readings or input fields
         morning_glucose = st.number_input("Morning Glucose (mg/dL)",
@@ -520,30 +408,63 @@ elif app_mode == "Meal Planner":
 
         user_food = st.text_area("Foods You'd Like to Eat (comma separated)",
                                  placeholder="E.g., chicken, rice, vegetables, pasta")
+        # Entries resolved to the food table's canonical names and IDs, correcting misspellings
+        with span("lexicon.parse"):
+            food_entries = get_food_lexicon().parse(user_food)
+        liked_ids = {food_id for entry in food_entries for food_id in entry["ids"]}
+        foods = ", ".join(dict.fromkeys(entry["term"] or entry["text"].lower() for entry in food_entries))
+        if food_entries:
+            recognized = [entry["term"] if entry["term"].lower() == entry["text"].lower()
+                          else f"{entry['term']} ({entry['text']})" for entry in food_entries if entry["term"]]
+            unknown = [entry for entry in food_entries if not entry["term"]]
+            st.caption("Recognized: " + (", ".join(recognized) or "none"))
+            for entry in unknown:
+                suggestions = f" Did you mean: {', '.join(entry['suggestions'])}?" if entry["suggestions"] else ""
+                st.caption(f"Not in the food list: {entry['text']}.{suggestions}")
 
         cuisine_preference = st.selectbox("Cuisine Preference (Optional)",
                                           ["Any", "Mediterranean", "Asian", "Mexican",
                                            "Italian", "American", "Indian", "Other"])
 
-    with col2:
-        if st.button("Get AI Recommendations", type="primary"):
-            with st.spinner("Generating personalized recommendations..."):
-                # Prepare message for AI
-                restrictions = ", ".join(dietary_restrictions) if dietary_restrictions else "None"
-                cuisine = cuisine_preference if cuisine_preference != "Any" else ""
+        explain = st.checkbox("Explain with AI", value=True,
+                              help="The suggested meals are computed locally; the AI adds an explanation")
 
+    with col2:
+        if st.button("Get Recommendations", type="primary"):
+            glucose = {"Morning": morning_glucose, "Afternoon": afternoon_glucose, "Evening": evening_glucose}
+            # Ranked meals from the local food table, scored against the readings in a few milliseconds
+            with span("nutrition.plan"):
+                plan = plan_meals(get_food_table(), meal_type, glucose, st.session_state.target_range,
+                                  dietary_restrictions, cuisine_preference, liked_ids)
+            advice = plan_markdown(plan)
+            st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
+            st.markdown("### Meal Suggestions")
+            st.markdown(advice)
+            st.markdown("</div>", unsafe_allow_html=True)
+            st.caption(f"Ranked {plan['candidates']:,} candidate meals for your {plan['period'].lower()} reading "
+                       f"of {plan['reading']} mg/dL.")
+
+            # Prepare message for AI
+            restrictions = ", ".join(dietary_restrictions) if dietary_restrictions else "None"
+            cuisine = cuisine_preference if cuisine_preference != "Any" else ""
+
+            if explain:
                 # Include user profile information if available
                 profile_info = ""
                 if st.session_state.diabetes_type:
                     profile_info = f"I have {st.session_state.diabetes_type} diabetes. "
                     profile_info += f"My target glucose range is {st.session_state.target_range[0]}-{st.session_state.target_range[1]} mg/dL. "
 
+                # Two weeks of history as a token-budgeted pattern summary, from aggregates kept current on every insert
+                patterns = pattern_summary(user.patterns, user.index, st.session_state.target_range)
+                history_summary = f"Patterns in my logged history:\n{format_summary(patterns)}" if patterns else ""
+
                 messages = [
-                    {"role": "system", "content": """You are a knowledgeable diabetes nutritional assistant providing 
-                    detailed and personalized dietary recommendations based on glucose levels. 
-                    Consider the glycemic index of foods, portion sizes, and overall balanced nutrition. 
-                    Provide specific meal ideas and explain why they're suitable based on the glucose readings.
-                    Include both what to eat and what to avoid based on the current readings."""},
+                    {"role": "system", "content": """You are a knowledgeable diabetes nutritional assistant explaining 
+                    meal suggestions to a person managing their glucose levels. The meals, portions and foods to avoid 
+                    were already chosen by a glycemic-load calculation; explain why they suit the glucose readings, 
+                    considering the glycemic index of foods, portion sizes, and overall balanced nutrition. 
+                    Do not replace the suggested meals with different ones."""},
 
                     {"role": "user", "content": f"""
                     {profile_info}
@@ -552,258 +473,306 @@ elif app_mode == "Meal Planner":
                     - Afternoon: {afternoon_glucose} mg/dL 
                     - Evening: {evening_glucose} mg/dL
 
+                    {history_summary}
+
                     I'm planning to eat for {meal_type}.
-                    I'm interested in eating: {user_food if user_food else "anything healthy"}
+                    I'm interested in eating: {foods if foods else "anything healthy"}
                     Dietary restrictions: {restrictions}
                     Cuisine preference: {cuisine}
 
+                    My meal planner suggests:
+                    {advice}
+
                     Please provide:
                     1. An analysis of my glucose patterns
-                    2. Specific meal recommendations with portions
-                    3. Foods to avoid based on my current readings
+                    2. Why these meals and portions suit my readings
+                    3. Why the listed foods are best avoided right now
                     4. Tips for maintaining stable glucose after this meal
                     """}
                 ]
 
-                try:
-                    response = client.chat.completions.create(
-                        model="microsoft/phi-4",
-                        temperature=0.3,
-                        messages=messages
-                    )
-
-                    ai_suggestion = response.choices[0].message.content
-
-                    # Save to recommendations history
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    recommendation_with_time = f"**{timestamp} - {meal_type} Recommendation**\n\n{ai_suggestion}"
-                    st.session_state.recommendations_history.append(recommendation_with_time)
+                cache_key = recommendation_key(meal_type, [morning_glucose, afternoon_glucose, evening_glucose],
+                                               dietary_restrictions, cuisine_preference, foods,
+                                               st.session_state.diabetes_type, st.session_state.target_range,
+                                               summary_key(patterns), plan_key(plan),
+                                               user.key if patterns else None)
 
-                    st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
-                    st.markdown("### AI Dietary Recommendations")
-                    st.write(ai_suggestion)
-                    st.markdown("</div>", unsafe_allow_html=True)
+                try:
+                    ai_suggestion = recommendation_cache.get(cache_key)
+                    if ai_suggestion is not None:
+                        st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
+                        st.markdown("### AI Explanation")
+                        st.write(ai_suggestion)
+                        st.markdown("</div>", unsafe_allow_html=True)
+                    else:
+                        tokens = get_client().stream(messages)
+                        # Only the wait for the first token happens behind the spinner; the rest streams in
+                        with st.spinner("Explaining the suggestions..."):
+                            first_token = next(tokens, "")
+
+                        st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
+                        st.markdown("### AI Explanation")
+                        ai_suggestion = st.write_stream(chain([first_token], tokens))
+                        st.markdown("</div>", unsafe_allow_html=True)
+                        recommendation_cache.put(cache_key, ai_suggestion)
+                    advice += f"\n\n**AI explanation:**\n\n{ai_suggestion}"
 
                 except Exception as e:
-                    st.error(f"Error generating recommendations: {str(e)}")
+                    st.error(f"Error generating the AI explanation: {str(e)}")
                     st.markdown("""
                     <div class='info-box'>
+                        The meal suggestions above don't need the AI service.<br>
                         <strong>Troubleshooting:</strong><br>
                         - Check your API key configuration<br>
                         - Ensure you have internet connectivity<br>
                         - Try again in a few moments
                     </div>
                     """, unsafe_allow_html=True)
+
+            # Save to the recommendation archive with the request it answered
+            user.add_recommendation(advice, meal_type=meal_type,
+                                    glucose=[morning_glucose, afternoon_glucose, evening_glucose],
+                                    restrictions=dietary_restrictions, cuisine=cuisine, foods=foods)
+
+            if explain:
+                gateway = get_client().metrics()
+                st.caption(f"Recommendation cache: {recommendation_cache.hits} hits, "
+                           f"{recommendation_cache.misses} misses ({recommendation_cache.hit_rate:.0%} hit rate) · "
+                           f"LLM queue: {gateway['queued']} waiting, {gateway['in_flight']} in flight, "
+                           f"p95 wait {gateway['wait_p95']:.1f}s")
         else:
             st.markdown(
-                "<div class='info-box'>Enter your glucose readings and food preferences, then click 'Get AI Recommendations'.</div>",
+                "<div class='info-box'>Enter your glucose readings and food preferences, then click 'Get Recommendations'.</div>",
                 unsafe_allow_html=True)
 
-            if st.session_state.recommendations_history:
+            if user.last_recommendation():
                 st.markdown("### Previous Recommendation")
                 st.markdown("<div class='recommendation-box'>", unsafe_allow_html=True)
-                st.write(st.session_state.recommendations_history[-1])
+                st.write(user.last_recommendation())
                 st.markdown("</div>", unsafe_allow_html=True)
 
-elif app_mode == "History":
+
+
+@st.fragment
+def history_export(first_day, last_day):
+    # Export: the file is written on click, in chunks, and reused until the history changes
+    col1, col2 = st.columns(2)
+    with col1:
+        export_range = st.date_input("Export Range", value=(first_day, last_day),
+                                     min_value=first_day, max_value=last_day)
+    with col2:
+        export_format = st.radio("Format", available_formats(), horizontal=True)
+    export_start = export_range[0]
+    export_end = (export_range[1] if len(export_range) > 1 else export_range[0]) + timedelta(days=1)
+    extension, mime = FORMATS[export_format]
+    export_args = (history, user.key, export_format, export_start, export_end)
+    st.download_button(
+        label=f"Export Data ({export_format})",
+        data=lambda: get_export_cache().read(*export_args),
+        file_name=f"glucose_history.{extension}",
+        mime=mime
+    )
+
+
+@st.fragment
+def recommendation_archive():
+    # Past advice, searched through the archive's word index and loaded one page at a time
+    archive = user.recommendations
+    st.markdown("<h2 class='sub-header'>Past Recommendations</h2>", unsafe_allow_html=True)
+    if not len(archive):
+        st.markdown(
+            "<div class='info-box'>No recommendations yet. Use the Meal Planner to get personalized advice.</div>",
+            unsafe_allow_html=True)
+        return
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Search advice", placeholder="Food, meal or advice, e.g. oatmeal, salmon")
+    with col2:
+        meal_filter = st.selectbox("Meal", ["All", "Breakfast", "Lunch", "Dinner", "Snack"])
+    meal_type = None if meal_filter == "All" else meal_filter
+
+    matches = archive.count(query, meal_type)
+    pages = max(1, -(-matches // PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+    st.caption(f"{matches:,} of {len(archive):,} recommendations")
+
+    for entry in archive.search(query, meal_type, page - 1):
+        glucose = "/".join(str(value) for value in entry['glucose'])
+        with st.expander(heading(entry) + (f" · {glucose} mg/dL" if glucose else "")):
+            details = ", ".join(filter(None, [", ".join(entry['restrictions']), entry['cuisine'], entry['foods']]))
+            if details:
+                st.caption(details)
+            st.markdown(archive.text(entry['id']))
+
+
+@st.fragment
+@timed("page.History")
+def history_page():
+    import pandas as pd
+    from charts import BOX_POINTS_THRESHOLD, box_figure, period_means_figure, time_in_range_gauge, trend_figure
+
     st.markdown("<h2 class='sub-header'>Glucose History & Trends</h2>", unsafe_allow_html=True)
 
-    if not st.session_state.glucose_history.empty:
+    if not history.empty:
+        # Time period for filtering, shared by all three tabs
+        period_filter = st.selectbox("Time Period",
+                                     ["All Time", "Last 7 Days", "Last 14 Days", "Last 30 Days", "Custom Range"],
+                                     index=1)
+
+        # Filter data based on selection
+        first_day, last_day = pd.Timestamp(history.timestamps[0]).date(), pd.Timestamp(history.timestamps[-1]).date()
+        today = pd.Timestamp.now().normalize()
+        range_start = range_end = None
+        if period_filter == "Custom Range":
+            custom_range = st.date_input("Date Range",
+                                         value=(max(first_day, last_day - timedelta(days=30)), last_day),
+                                         min_value=first_day, max_value=last_day)
+            range_start = pd.Timestamp(custom_range[0])
+            range_end = pd.Timestamp(custom_range[-1]) + timedelta(days=1)
+        elif period_filter != "All Time":
+            days = int(period_filter.split()[1])
+            range_start = today - timedelta(days=days)
+        lo, hi = history.bounds(range_start, range_end)
+        summary = history_statistics(user.key, history.version, range_start, range_end,
+                                     tuple(st.session_state.target_range), user.index)
+
         tab1, tab2, tab3 = st.tabs(["Data Table", "Charts", "Statistics"])
 
         with tab1:
-            st.dataframe(st.session_state.glucose_history.sort_values(by=['Date', 'Time'], ascending=False),
-                         use_container_width=True)
-
-            if st.button("Export Data (CSV)"):
-                csv = st.session_state.glucose_history.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="glucose_history.csv",
-                    mime="text/csv"
-                )
+            st.dataframe(history.to_frame().iloc[lo:hi].iloc[::-1], use_container_width=True)
+            history_export(first_day, last_day)
+
+        # Charts depend on the history, target range and the resolved date range
+        view = (period_filter, range_start, range_end)
 
         with tab2:
-            # Time period for filtering
-            period_filter = st.selectbox("Time Period",
-                                         ["All Time", "Last 7 Days", "Last 14 Days", "Last 30 Days"],
-                                         index=1)
-
-            # Filter data based on selection
-            filtered_data = st.session_state.glucose_history.copy()
-            if period_filter != "All Time":
-                days = int(period_filter.split()[1])
-                cutoff_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-                filtered_data = filtered_data[filtered_data['Date'] >= cutoff_date]
-
-            # Create a Plotly figure - Time Series
-            fig1 = go.Figure()
-
-            # Add the glucose readings
-            fig1.add_trace(go.Scatter(
-                x=filtered_data['Date'] + ' ' + filtered_data['Time'],
-                y=filtered_data['Reading'],
-                mode='lines+markers',
-                name='Glucose',
-                marker=dict(size=8, color='#3366cc'),
-                line=dict(width=2, color='#3366cc')
-            ))
-
-            # Add target range as a shaded area
-            fig1.add_trace(go.Scatter(
-                x=filtered_data['Date'] + ' ' + filtered_data['Time'],
-                y=[st.session_state.target_range[1]] * len(filtered_data),
-                fill=None,
-                mode='lines',
-                line=dict(width=0),
-                showlegend=False
-            ))
-
-            fig1.add_trace(go.Scatter(
-                x=filtered_data['Date'] + ' ' + filtered_data['Time'],
-                y=[st.session_state.target_range[0]] * len(filtered_data),
-                fill='tonexty',
-                mode='lines',
-                line=dict(width=0),
-                fillcolor='rgba(76, 175, 80, 0.2)',
-                name='Target Range'
-            ))
-
-            # Layout configuration
-            fig1.update_layout(
-                title='Glucose Readings Over Time',
-                xaxis_title='Date and Time',
-                yaxis_title='Glucose Level (mg/dL)',
-                height=400,
-                margin=dict(l=40, r=40, t=40, b=40),
-                hovermode='closest'
-            )
+            # Time series of the filtered readings
+            fig1 = cached_figure("History", "trend", lambda: trend_figure(
+                history.timestamps[lo:hi], history.readings[lo:hi], st.session_state.target_range), *view)
 
-            st.plotly_chart(fig1, use_container_width=True)
+            with span("figure.render"):
+                st.plotly_chart(fig1, use_container_width=True)
 
             # Box plot by time period
-            fig2 = go.Figure()
-
-            for period in ["Morning", "Afternoon", "Evening"]:
-                period_data = filtered_data[filtered_data['Period'].str.contains(period)]
-                if not period_data.empty:
-                    fig2.add_trace(go.Box(
-                        y=period_data['Reading'],
-                        name=period,
-                        boxpoints='all',
-                        jitter=0.3,
-                        pointpos=-1.8
-                    ))
-
-            fig2.update_layout(
-                title='Glucose Distribution by Time of Day',
-                yaxis_title='Glucose Level (mg/dL)',
-                height=400,
-                margin=dict(l=40, r=40, t=40, b=40)
-            )
+            def build_box_figure():
+                if hi - lo <= BOX_POINTS_THRESHOLD:
+                    period_readings = split_by_bucket(history.period_codes[lo:hi], history.readings[lo:hi])
+                    return box_figure({period: values for period, values in period_readings.items()
+                                       if period in ["Morning", "Afternoon", "Evening"]})
+                # Too many readings to draw individually: boxes from the range index's quartiles
+                return box_figure(boxes=summary['boxes'])
+
+            fig2 = cached_figure("History", "box", build_box_figure, *view)
 
-            st.plotly_chart(fig2, use_container_width=True)
+            with span("figure.render"):
+                st.plotly_chart(fig2, use_container_width=True)
 
         with tab3:
             col1, col2 = st.columns(2)
 
             with col1:
-                if not filtered_data.empty:
+                if summary:
                     st.markdown("### Overall Statistics")
-                    avg = filtered_data['Reading'].mean()
-                    median = filtered_data['Reading'].median()
-                    std_dev = filtered_data['Reading'].std()
-                    min_val = filtered_data['Reading'].min()
-                    max_val = filtered_data['Reading'].max()
-
                     st.markdown(f"""
                     <div class='info-box'>
-                        <strong>Average:</strong> {avg:.1f} mg/dL<br>
-                        <strong>Median:</strong> {median:.1f} mg/dL<br>
-                        <strong>Standard Deviation:</strong> {std_dev:.1f} mg/dL<br>
-                        <strong>Range:</strong> {min_val} - {max_val} mg/dL
+                        <strong>Average:</strong> {summary['mean']:.1f} mg/dL<br>
+                        <strong>Median:</strong> {summary['median']:.1f} mg/dL<br>
+                        <strong>Interquartile Range:</strong> {summary['q1']:.1f} - {summary['q3']:.1f} mg/dL<br>
+                        <strong>Standard Deviation:</strong> {summary['std']:.1f} mg/dL<br>
+                        <strong>Range:</strong> {summary['min']} - {summary['max']} mg/dL
                     </div>
                     """, unsafe_allow_html=True)
 
                     # Calculate time in range
-                    in_range = len(filtered_data[
-                                       (filtered_data['Reading'] >= st.session_state.target_range[0]) &
-                                       (filtered_data['Reading'] <= st.session_state.target_range[1])
-                                       ])
-                    total = len(filtered_data)
-                    percentage = (in_range / total) * 100 if total > 0 else 0
-
-                    fig3 = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=percentage,
-                        domain={'x': [0, 1], 'y': [0, 1]},
-                        title={'text': "Time in Range (%)"},
-                        gauge={
-                            'axis': {'range': [0, 100]},
-                            'bar': {'color': "#3366cc"},
-                            'steps': [
-                                {'range': [0, 50], 'color': "#ffcccb"},
-                                {'range': [50, 70], 'color': "#ffffcc"},
-                                {'range': [70, 100], 'color': "#ccffcc"}
-                            ],
-                            'threshold': {
-                                'line': {'color': "green", 'width': 2},
-                                'thickness': 0.75,
-                                'value': 70
-                            }
-                        }
-                    ))
-
-                    fig3.update_layout(height=250)
-                    st.plotly_chart(fig3)
+                    percentage = (summary['in_range'] / summary['count']) * 100
+
+                    fig3 = cached_figure("History", "gauge", lambda: time_in_range_gauge(percentage), *view)
+                    with span("figure.render"):
+                        st.plotly_chart(fig3)
 
             with col2:
                 st.markdown("### Time of Day Analysis")
 
-                # Calculate averages by time of day
-                time_averages = {}
-                for period in ["Morning", "Afternoon", "Evening"]:
-                    period_data = filtered_data[filtered_data['Period'].str.contains(period)]
-                    if not period_data.empty:
-                        time_averages[period] = period_data['Reading'].mean()
+                # Averages by time of day
+                time_averages = summary['period_means'] if summary else {}
 
                 if time_averages:
-                    fig4 = go.Figure(go.Bar(
-                        x=list(time_averages.keys()),
-                        y=list(time_averages.values()),
-                        marker_color='#3366cc'
-                    ))
-
-                    fig4.update_layout(
-                        title='Average Glucose by Time of Day',
-                        xaxis_title='Time of Day',
-                        yaxis_title='Average Glucose (mg/dL)',
-                        height=250
-                    )
-
-                    # Add a horizontal line for target range
-                    target_mid = (st.session_state.target_range[0] + st.session_state.target_range[1]) / 2
-                    fig4.add_shape(
-                        type="line",
-                        x0=-0.5,
-                        y0=target_mid,
-                        x1=2.5,
-                        y1=target_mid,
-                        line=dict(
-                            color="green",
-                            width=2,
-                            dash="dash",
-                        )
-                    )
-
-                    st.plotly_chart(fig4)
+                    fig4 = cached_figure("History", "period_means", lambda: period_means_figure(
+                        time_averages, st.session_state.target_range), *view)
+                    with span("figure.render"):
+                        st.plotly_chart(fig4)
     else:
         st.markdown(
             "<div class='info-box'>No glucose data available yet. Start logging your readings to see history and trends.</div>",
             unsafe_allow_html=True)
 
+    recommendation_archive()
+
+
+@st.fragment
+def performance_page():
+    import pandas as pd
+
+    st.markdown("<h2 class='sub-header'>Performance</h2>", unsafe_allow_html=True)
+    st.markdown(
+        "<div class='info-box'>Timings of instrumented code paths in this server process, over the last "
+        f"{recorder.capacity:,} samples of each span.</div>",
+        unsafe_allow_html=True)
+
+    spans = recorder.snapshot()
+    if spans:
+        table = pd.DataFrame.from_dict(spans, orient='index')
+        for column in ['mean', 'p50', 'p95', 'p99', 'max', 'total']:
+            table[column] = (table[column] * 1000).round(2)
+        table.columns = ['Count', 'Total (ms)', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)']
+        st.dataframe(table, use_container_width=True)
+    else:
+        st.markdown("<div class='info-box'>No timings recorded yet.</div>", unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Export JSON", data=recorder.to_json, file_name="gluco_spans.json",
+                           mime="application/json")
+    with col2:
+        st.download_button("Export OpenMetrics", data=recorder.to_openmetrics, file_name="gluco_spans.txt",
+                           mime="application/openmetrics-text")
+    with col3:
+        if st.button("Reset"):
+            recorder.reset()
+            st.rerun(scope="fragment")
+
+    figures = get_figure_cache()
+    gateway = get_client().metrics()
+    st.caption(f"Figure cache: {len(figures)} figures, {figures.bytes / 1e6:.1f} MB, {figures.hits} hits, "
+               f"{figures.misses} misses · Recommendation cache: {len(recommendation_cache)} entries, "
+               f"{recommendation_cache.hit_rate:.0%} hit rate · LLM: {gateway['upstream']} upstream calls, "
+               f"{gateway['coalesced']} coalesced, {gateway['retries']} retries, {gateway['failures']} failures")
+    if ingest_port:
+        ingest = get_ingest_server().status()
+        st.caption(f"Live ingest: {ingest['queued']:,} of {ingest['capacity']:,} readings queued, "
+                   f"{ingest['written']:,} written in {ingest['flushes']:,} batches, {ingest['duplicates']:,} "
+                   f"duplicates, {ingest['refused']:,} refused (queue full), {ingest['invalid']:,} invalid")
+
+
+# Main app
+st.markdown("<h1 class='main-header'>Gluco Guide - AI-Powered Diabetes Assistant</h1>", unsafe_allow_html=True)
+
+# Display different sections based on navigation
+if app_mode == "Dashboard":
+    dashboard_page()
+elif app_mode == "Log Glucose":
+    log_glucose_page()
+elif app_mode == "Meal Planner":
+    meal_planner_page()
+elif app_mode == "History":
+    history_page()
+elif app_mode == "Performance":
+    performance_page()
+
 # Footer with disclaimer
 st.markdown(
     "<div class='disclaimer'>⚠️ <strong>Important Disclaimer:</strong> This application provides general guidance only and is not a substitute for professional medical advice. Always consult your healthcare provider before making any changes to your diabetes management plan.</div>",
     unsafe_allow_html=True)
+
+recorder.record("app.rerun", time.perf_counter() - rerun_started)
@@ -0,0 +1,244 @@
+import csv
+import os
+
+import numpy as np
+
+# Bundled food table: one serving per row with a stable ID (never reused), its glycemic index, available (net)
+# carbohydrate, fibre and protein in grams, the meals it suits (B/L/D/S), the Dietary Restrictions it satisfies,
+# the cuisines it belongs to ("*" = any) and synonyms for the food lexicon. Values are approximate, compiled from
+# international GI tables and USDA data.
+FOODS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "foods.csv")
+
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snack"]
+# Dietary Restrictions options that are a property of each food; "Low-Carb" lowers the carbohydrate budget
+TAGS = {"Vegetarian": "vegetarian", "Vegan": "vegan", "Gluten-Free": "gluten-free", "Dairy-Free": "dairy-free",
+        "Low-Sugar": "low-sugar", "Low-Sodium": "low-sodium"}
+CUISINES = ["Mediterranean", "Asian", "Mexican", "Italian", "American", "Indian"]
+
+# A candidate meal takes one food from each slot (sets of food categories)
+SLOTS = {
+    "Breakfast": [{"protein", "dairy"}, {"starch"}, {"fruit", "vegetable", "nuts"}],
+    "Lunch": [{"protein", "legume"}, {"starch", "legume"}, {"vegetable"}],
+    "Dinner": [{"protein", "legume"}, {"starch", "legume"}, {"vegetable"}],
+    "Snack": [{"fruit", "vegetable", "starch"}, {"dairy", "nuts", "protein"}],
+}
+# Reading each meal is planned against; a snack uses the highest of the three
+MEAL_PERIOD = {"Breakfast": "Morning", "Lunch": "Afternoon", "Dinner": "Evening"}
+# Carbohydrate (g) and glycemic load per meal when the reading is in range
+CARB_BUDGET = {"Breakfast": 45, "Lunch": 50, "Dinner": 50, "Snack": 15}
+GL_LIMIT = {"Breakfast": 20, "Lunch": 20, "Dinner": 20, "Snack": 10}
+LOW_CARB_FACTOR = 0.6
+HIGH_GI = 70
+HYPO_BELOW = 70
+# Portions of the starchiest food are scaled to the budget within these bounds, in quarter servings
+PORTION_RANGE = (0.5, 1.5)
+
+
+class FoodTable:
+    """The food table as column arrays, ready for vectorized scoring.
+
+    Restrictions, cuisines and meals are bitmasks per food, so filtering
+    the table for a request is a couple of integer ANDs.
+    """
+
+    def __init__(self, rows):
+        self.ids = np.array([int(row["id"]) for row in rows])
+        self.names = [row["name"] for row in rows]
+        self.synonyms = [[s for s in row["synonyms"].split(";") if s] for row in rows]
+        self.categories = np.array([row["category"] for row in rows])
+        for column in ("gi", "carbs", "fiber", "protein", "grams"):
+            setattr(self, column, np.array([float(row[column]) for row in rows]))
+        self.gl = self.gi * self.carbs / 100
+        tag_bits = {tag: 1 << i for i, tag in enumerate(TAGS.values())}
+        self.tags = np.array([sum(tag_bits[t] for t in row["tags"].split(";") if t) for row in rows])
+        everything = (1 << len(CUISINES)) - 1
+        self.cuisines = np.array([everything if row["cuisines"] == "*" else
+                                  sum(1 << CUISINES.index(c.title()) for c in row["cuisines"].split(";"))
+                                  for row in rows])
+        self.meals = np.array([sum(1 << "BLDS".index(m) for m in row["meals"]) for row in rows])
+        self._tag_bits = tag_bits
+
+    @classmethod
+    def load(cls, path=FOODS_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def tag_mask(self, restrictions):
+        return sum(self._tag_bits[TAGS[r]] for r in restrictions if r in TAGS)
+
+    def eligible(self, meal_type, restrictions=()):
+        """Boolean mask of the foods suited to ``meal_type`` that satisfy every restriction."""
+        required = self.tag_mask(restrictions)
+        return ((self.meals >> MEAL_TYPES.index(meal_type)) & 1).astype(bool) & (self.tags & required == required)
+
+    def liked(self, food_ids):
+        """Boolean mask of the foods with the given IDs."""
+        return np.isin(self.ids, list(food_ids))
+
+
+def _status(reading, target_range):
+    low, high = target_range
+    if reading < HYPO_BELOW:
+        return "low"
+    if reading < low:
+        return "below"
+    return "above" if reading > high else "in range"
+
+
+def candidate_meals(table, meal_type, restrictions=()):
+    """Index matrix of every candidate meal: one row per meal, one column per slot, no food twice."""
+    eligible = table.eligible(meal_type, restrictions)
+    slots = [np.flatnonzero(eligible & np.isin(table.categories, list(categories)))
+             for categories in SLOTS[meal_type]]
+    if any(not len(slot) for slot in slots):
+        return np.zeros((0, len(slots)), dtype=np.intp)
+    combos = np.stack(np.meshgrid(*slots, indexing="ij"), axis=-1).reshape(-1, len(slots))
+    distinct = np.ones(len(combos), dtype=bool)
+    for a in range(len(slots)):
+        for b in range(a + 1, len(slots)):
+            distinct &= combos[:, a] != combos[:, b]
+    return combos[distinct]
+
+
+def plan_meals(table, meal_type, glucose, target_range, restrictions=(), cuisine="Any", liked=(), top=3):
+    """Rank candidate meals for ``meal_type`` against the entered readings and return the plan.
+
+    ``glucose`` maps "Morning", "Afternoon" and "Evening" to mg/dL. The meal
+    is planned against the reading before it: above the target range the
+    carbohydrate budget and glycemic-load limit shrink, below it they grow a
+    little. Every candidate is scored at once: the starchiest food's portion
+    is scaled towards the budget, then glycemic load over the limit, distance
+    from the budget, high-GI foods, fibre, protein, liked foods (food IDs
+    from ``food_lexicon``) and cuisine decide the rank. The top ``top``
+    meals that differ in at least two foods are returned with the high-GL
+    foods to avoid and portion notes.
+    """
+    period = MEAL_PERIOD.get(meal_type) or max(glucose, key=glucose.get)
+    reading = glucose[period]
+    status = _status(reading, target_range)
+    low, high = target_range
+    factor = 1.0
+    if status in ("low", "below"):
+        factor = 1.15
+    elif status == "above":
+        factor = max(0.6, 1 - (reading - high) / 250)
+    if "Low-Carb" in restrictions:
+        factor *= LOW_CARB_FACTOR
+    budget, max_gl = CARB_BUDGET[meal_type] * factor, GL_LIMIT[meal_type] * factor
+
+    combos = candidate_meals(table, meal_type, restrictions)
+    carbs = table.carbs[combos]
+    # Scale the starchiest food of each meal so the meal lands near the budget
+    rows = np.arange(len(combos))
+    starch = carbs.argmax(axis=1)
+    rest = carbs.sum(axis=1) - carbs[rows, starch]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(carbs[rows, starch] > 0, (budget - rest) / carbs[rows, starch], 1.0)
+    portions = np.ones(combos.shape)
+    portions[rows, starch] = np.round(np.clip(scale, *PORTION_RANGE) * 4) / 4
+
+    meal_carbs = (carbs * portions).sum(axis=1)
+    meal_gl = (table.gl[combos] * portions).sum(axis=1)
+    fiber = (table.fiber[combos] * portions).sum(axis=1)
+    protein = (table.protein[combos] * portions).sum(axis=1)
+    high_gi = (table.gi[combos] >= HIGH_GI).sum(axis=1)
+    score = (-3 * np.maximum(meal_gl - max_gl, 0) / max_gl
+             - np.abs(meal_carbs - budget) / budget
+             - 0.3 * high_gi * (2 if status == "above" else 1)
+             + 0.04 * np.minimum(fiber, 15)
+             + 0.02 * np.minimum(protein, 35)
+             + 0.6 * table.liked(liked)[combos].sum(axis=1))
+    if cuisine in CUISINES:
+        score += 0.25 * ((table.cuisines[combos] >> CUISINES.index(cuisine)) & 1).mean(axis=1)
+
+    meals = []
+    for i in np.argsort(-score, kind="stable"):
+        chosen = set(table.ids[combos[i]].tolist())
+        if any(len(chosen & set(m["ids"])) > 1 for m in meals):
+            continue
+        meals.append({
+            "ids": table.ids[combos[i]].tolist(),
+            "foods": [{"id": int(table.ids[f]), "name": table.names[f], "grams": int(round(table.grams[f] * p / 5) * 5),
+                       "carbs": float(table.carbs[f] * p), "gi": int(table.gi[f])}
+                      for f, p in zip(combos[i], portions[i])],
+            "carbs": float(meal_carbs[i]),
+            "gl": float(meal_gl[i]),
+            "fiber": float(fiber[i]),
+            "protein": float(protein[i]),
+            "score": float(score[i]),
+        })
+        if len(meals) == top:
+            break
+
+    # High glycemic-load foods usually eaten at this meal; stricter when the reading is high
+    avoid = []
+    if status != "low":
+        suited = ((table.meals >> MEAL_TYPES.index(meal_type)) & 1).astype(bool)
+        limit = 10 if status == "above" else 15
+        flagged = np.flatnonzero(suited & ((table.gl >= limit) | (table.gi >= HIGH_GI)))
+        avoid = [{"name": table.names[f], "gi": int(table.gi[f]), "gl": float(table.gl[f])}
+                 for f in flagged[np.argsort(-table.gl[flagged], kind="stable")][:6]]
+
+    return {
+        "meal_type": meal_type,
+        "period": period,
+        "reading": reading,
+        "status": status,
+        "target_range": (low, high),
+        "carb_budget": budget,
+        "max_gl": max_gl,
+        "candidates": len(combos),
+        "meals": meals,
+        "avoid": avoid,
+        "notes": _notes(meal_type, period, reading, status, budget, max_gl),
+    }
+
+
+def plan_key(plan):
+    """What an explanation of ``plan`` depends on, for cache keys: status, budgets, chosen meals, foods to avoid."""
+    return {
+        "status": plan["status"],
+        "carb_budget": round(plan["carb_budget"]),
+        "max_gl": round(plan["max_gl"]),
+        "meals": [meal["ids"] for meal in plan["meals"]],
+        "avoid": [food["name"] for food in plan["avoid"]],
+    }
+
+
+def _notes(meal_type, period, reading, status, budget, max_gl):
+    reading_text = f"Your {period.lower()} reading of {reading} mg/dL"
+    if status == "low":
+        return [f"{reading_text} is low: treat it first with 15 g of fast-acting carbohydrate (half a cup of juice "
+                f"or 4 glucose tablets), recheck after 15 minutes, then eat.",
+                f"Keep this {meal_type.lower()} to about {budget:.0f} g of carbohydrate and don't skip it."]
+    if status == "below":
+        notes = [f"{reading_text} is below your target: include the full portion of carbohydrate "
+                 f"(about {budget:.0f} g) and don't delay the meal."]
+    elif status == "above":
+        notes = [f"{reading_text} is above your target: keep carbohydrate to about {budget:.0f} g and the "
+                 f"glycemic load under {max_gl:.0f}.",
+                 "A 10-15 minute walk after eating helps blunt the rise."]
+    else:
+        notes = [f"{reading_text} is in range: aim for about {budget:.0f} g of carbohydrate and a glycemic load "
+                 f"under {max_gl:.0f}."]
+    return notes + ["Eat the vegetables and protein first and the starch last; check again two hours after eating."]
+
+
+def plan_markdown(plan):
+    """Render a plan from ``plan_meals`` as the markdown shown and archived for the request."""
+    lines = [f"**Suggested meals** (about {plan['carb_budget']:.0f} g carbohydrate, glycemic load under "
+             f"{plan['max_gl']:.0f}):"]
+    for n, meal in enumerate(plan["meals"], 1):
+        foods = ", ".join(f"{food['name']} ({food['grams']} g)" for food in meal["foods"])
+        lines.append(f"{n}. {foods}: {meal['carbs']:.0f} g carbs, GL {meal['gl']:.0f}, "
+                     f"{meal['fiber']:.0f} g fibre, {meal['protein']:.0f} g protein")
+    if not plan["meals"]:
+        lines.append("- No foods in the table match these restrictions for this meal.")
+    if plan["avoid"]:
+        lines += ["", "**Foods to avoid at this reading:** " + ", ".join(
+            f"{food['name']} (GI {food['gi']}, GL {food['gl']:.0f})" for food in plan["avoid"])]
+    lines += ["", "**Portion guidance:**"] + [f"- {note}" for note in plan["notes"]]
+    return "\n".join(lines)
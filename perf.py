@@ -0,0 +1,112 @@
+import collections
+import contextlib
+import functools
+import json
+import threading
+import time
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Span:
+    def __init__(self, capacity):
+        self.samples = collections.deque(maxlen=capacity)
+        self.count = 0
+        self.total = 0.0
+
+
+class Recorder:
+    """Timing spans kept in fixed-size ring buffers, one per span name.
+
+    Recording a sample is two ``perf_counter()`` calls and a deque append, so
+    spans can wrap hot paths. Percentiles are computed over the last
+    ``capacity`` samples when a snapshot is taken; count and total cover the
+    whole process lifetime.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.started = time.time()
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def _span(self, name):
+        span = self._spans.get(name)
+        if span is None:
+            with self._lock:
+                span = self._spans.setdefault(name, _Span(self.capacity))
+        return span
+
+    def record(self, name, seconds):
+        span = self._span(name)
+        span.samples.append(seconds)
+        span.count += 1
+        span.total += seconds
+
+    @contextlib.contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """Decorator form of ``span()``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """Return ``{span: {count, total, mean, p50, p95, p99, max}}`` in seconds, sorted by name."""
+        stats = {}
+        for name in sorted(self._spans):
+            span = self._spans[name]
+            samples = np.fromiter(list(span.samples), dtype=np.float64)
+            if not samples.size:
+                continue
+            p50, p95, p99 = np.quantile(samples, QUANTILES)
+            stats[name] = {
+                "count": span.count,
+                "total": span.total,
+                "mean": float(samples.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(samples.max()),
+            }
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._spans = {}
+            self.started = time.time()
+
+    def to_json(self):
+        return json.dumps({"started": self.started, "spans": self.snapshot()}, indent=2)
+
+    def to_openmetrics(self, prefix="gluco"):
+        """Render the spans as an OpenMetrics summary of seconds per span."""
+        metric = f"{prefix}_span_seconds"
+        lines = [f"# TYPE {metric} summary", f"# UNIT {metric} seconds",
+                 f"# HELP {metric} Duration of instrumented code paths."]
+        for name, stats in self.snapshot().items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{metric}{{span="{label}",quantile="{q}"}} {stats[f"p{round(q * 100)}"]:.9f}')
+            lines.append(f'{metric}_sum{{span="{label}"}} {stats["total"]:.9f}')
+            lines.append(f'{metric}_count{{span="{label}"}} {stats["count"]}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide recorder shared by the app and the modules it instruments
+recorder = Recorder()
+span = recorder.span
+timed = recorder.timed
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+
+from glucose_stats import RunningAggregate
+from glucose_store import BUCKETS, MAX_READING, PERIOD_BUCKET
+
+# Rows summarized per index block; a query scans at most two partial blocks
+BLOCK = 4096
+_VALUES = MAX_READING + 1
+
+
+class RangeIndex:
+    """Answers aggregate queries over arbitrary time ranges of a ``GlucoseStore``.
+
+    Every ``BLOCK`` rows the index stores the running per-bucket histogram of
+    readings (a prefix sum over blocks). A query for ``start <= timestamp <
+    end`` finds its row range by binary search, subtracts two prefix
+    histograms for the whole blocks inside it and bins only the rows at
+    either edge, so its cost is bounded by the block size rather than the
+    number of readings in the range. The resulting ``RunningAggregate`` gives
+    count, mean, std, quantiles, time-in-range and per-bucket means without
+    another pass over the data.
+
+    Inserts invalidate the blocks from the first inserted position onward;
+    they are rebuilt lazily on the next query, so appends only ever redo the
+    last block.
+    """
+
+    def __init__(self, store, block=BLOCK):
+        self.store = store
+        self.block = block
+        self._cum = np.zeros((1, len(BUCKETS), _VALUES), dtype=np.int32)
+        self._valid = 0
+        store.subscribe(self._on_insert)
+
+    def _on_insert(self, positions):
+        # Runs under the store's lock
+        if len(positions):
+            self._valid = min(self._valid, int(positions.min()) // self.block)
+
+    def _refresh(self):
+        full = len(self.store) // self.block
+        if self._valid >= full and len(self._cum) > full:
+            return
+        if len(self._cum) < full + 1:
+            grown = np.zeros((max(full + 1, 2 * len(self._cum)), len(BUCKETS), _VALUES), dtype=np.int32)
+            grown[:self._valid + 1] = self._cum[:self._valid + 1]
+            self._cum = grown
+        lo, hi = self._valid * self.block, full * self.block
+        blocks = np.arange(hi - lo) // self.block
+        cells = (blocks * len(BUCKETS) + PERIOD_BUCKET[self.store.period_codes[lo:hi]]) * _VALUES \
+            + self.store.readings[lo:hi]
+        counts = np.bincount(cells, minlength=(full - self._valid) * len(BUCKETS) * _VALUES)
+        counts = counts.reshape(full - self._valid, len(BUCKETS), _VALUES)
+        self._cum[self._valid + 1:full + 1] = self._cum[self._valid] + np.cumsum(counts, axis=0)
+        self._valid = full
+
+    def _bin(self, lo, hi):
+        cells = PERIOD_BUCKET[self.store.period_codes[lo:hi]].astype(np.intp) * _VALUES + self.store.readings[lo:hi]
+        return np.bincount(cells, minlength=len(BUCKETS) * _VALUES).reshape(len(BUCKETS), _VALUES)
+
+    def counts(self, start=None, end=None):
+        """Return the ``(len(BUCKETS), V)`` reading counts for ``start <= timestamp < end``."""
+        with self.store.lock:
+            self._refresh()
+            lo, hi = self.store.bounds(start, end)
+            first, last = -(-lo // self.block), hi // self.block
+            if first >= last:
+                return self._bin(lo, hi)
+            counts = self._cum[last].astype(np.int64) - self._cum[first]
+            counts += self._bin(lo, first * self.block)
+            counts += self._bin(last * self.block, hi)
+            return counts
+
+    def aggregate(self, start=None, end=None, bucket=None):
+        """Return a ``RunningAggregate`` of the readings in the range, optionally of one bucket only."""
+        counts = self.counts(start, end)
+        if bucket is not None:
+            only = np.zeros_like(counts)
+            b = BUCKETS.index(bucket)
+            only[b] = counts[b]
+            counts = only
+        return RunningAggregate.from_counts(counts)
+
+
+def box_summary(agg):
+    """Tukey box plot statistics of an aggregate, for a precomputed Plotly box."""
+    q1, median, q3 = agg.quantile(0.25), agg.median, agg.quantile(0.75)
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    # Whiskers end at the most extreme readings inside the fences
+    below = agg.hist.count_le(math.ceil(low) - 1)
+    within = agg.hist.count_le(math.floor(high))
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': agg.hist.kth(below),
+        'upperfence': agg.hist.kth(within - 1),
+        'mean': agg.mean,
+    }
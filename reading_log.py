@@ -0,0 +1,120 @@
+import json
+import os
+import re
+
+import numpy as np
+
+# Fixed-width on-disk record: nanosecond timestamp, reading, period code and a
+# flag telling whether the row has an entry in the notes side file.
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('reading', '<i2'),
+    ('period', 'i1'),
+    ('has_notes', 'u1'),
+    ('_pad', 'V4'),
+])
+
+_MAGIC = b"GLUCLOG1"
+_HEADER_SIZE = 16
+
+
+def data_dir():
+    return os.environ.get("GLUCO_DATA_DIR", ".gluco_data")
+
+
+def user_key(name):
+    """Normalize a profile name into a directory-safe key."""
+    key = re.sub(r"[^a-z0-9]+", "-", (name or "").strip().lower()).strip("-")
+    return key or "default"
+
+
+class ReadingLog:
+    """Append-only reading log for one user.
+
+    ``readings.bin`` holds a short header followed by ``RECORD_DTYPE`` rows in
+    the order they were saved; free-text notes go to ``notes.jsonl`` keyed by
+    row number. ``load()`` memory-maps the records read-only, so opening a
+    long history costs a page-table mapping rather than a parse, and the pages
+    are shared through the OS cache by every session and process reading it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, "readings.bin")
+        self.notes_path = os.path.join(directory, "notes.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                f.write(_MAGIC.ljust(_HEADER_SIZE, b"\0"))
+        self._count = self._recover()
+
+    @classmethod
+    def for_user(cls, name, root=None):
+        return cls(os.path.join(root or data_dir(), user_key(name)))
+
+    def __len__(self):
+        return self._count
+
+    def _recover(self):
+        # Drop a partially written trailing record left by an interrupted save
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{self.path} is not a glucose reading log")
+        count = (size - _HEADER_SIZE) // RECORD_DTYPE.itemsize
+        expected = _HEADER_SIZE + count * RECORD_DTYPE.itemsize
+        if size != expected:
+            with open(self.path, "r+b") as f:
+                f.truncate(expected)
+        return count
+
+    def load(self):
+        """Return ``(records, notes)``: a read-only memmap and a ``{row: text}`` dict."""
+        if self._count:
+            records = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r",
+                                offset=_HEADER_SIZE, shape=(self._count,))
+        else:
+            records = np.empty(0, dtype=RECORD_DTYPE)
+        notes = {}
+        if os.path.exists(self.notes_path):
+            with open(self.notes_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    row = entry["row"]
+                    if row < self._count and records['has_notes'][row]:
+                        notes[row] = entry["text"]
+        return records, notes
+
+    def append(self, ts, reading, period, notes=""):
+        """Append a single reading; ``ts`` is a datetime64 value."""
+        self.extend([ts], [reading], [period], [notes])
+
+    def extend(self, timestamps, readings, periods, notes=None):
+        """Append parallel columns of readings."""
+        records = np.zeros(len(readings), dtype=RECORD_DTYPE)
+        records['ts'] = np.asarray(timestamps, dtype="datetime64[ns]").astype(np.int64)
+        records['reading'] = readings
+        records['period'] = periods
+        self.append_many(records, notes)
+
+    def append_many(self, records, notes=None):
+        """Append a ``RECORD_DTYPE`` array; ``notes`` is an optional parallel sequence."""
+        records = np.asarray(records, dtype=RECORD_DTYPE).copy()
+        first = self._count
+        lines = []
+        if notes is not None:
+            for i, text in enumerate(notes):
+                if text:
+                    records['has_notes'][i] = 1
+                    lines.append(json.dumps({"row": first + i, "text": text}) + "\n")
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._count += len(records)
+        if lines:
+            with open(self.notes_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+# Words too common in the advice to be worth indexing
+STOPWORDS = frozenset(
+    "a an and are as at be but by can for from has have if in into is it its of on or so than that the their "
+    "these this those to was were will with you your".split())
+PAGE_SIZE = 10
+
+_WORD = re.compile(r"[a-z0-9]+")
+_COLUMNS = "id, created, meal_type, glucose, restrictions, cuisine, foods"
+
+
+def heading(entry):
+    """Title line of an archived recommendation, e.g. ``2024-05-01 08:30 - Breakfast Recommendation``."""
+    return f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created']))} - {entry['meal_type']} Recommendation"
+
+
+def _entry(row):
+    rec_id, created, meal_type, glucose, restrictions, cuisine, foods = row
+    return {
+        "id": rec_id,
+        "created": created,
+        "meal_type": meal_type,
+        "glucose": json.loads(glucose),
+        "restrictions": json.loads(restrictions),
+        "cuisine": cuisine,
+        "foods": foods,
+    }
+
+
+def index_terms(text):
+    """Distinct lowercase words of ``text`` worth indexing."""
+    return {word for word in _WORD.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS}
+
+
+class RecommendationArchive:
+    """One user's Meal Planner recommendations, compressed on disk and searchable.
+
+    Each response is stored zlib-compressed in a SQLite file next to the
+    request it answered (meal type, glucose inputs, restrictions, cuisine,
+    foods). An inverted index maps every word of the response and request to
+    the recommendations containing it (words are stored once and postings as
+    integer pairs), so a search for foods or meals is a few index range
+    scans, and only the page of results being shown is ever decompressed.
+    Nothing but the newest response is kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS recommendations (
+            id INTEGER PRIMARY KEY, created REAL NOT NULL, meal_type TEXT NOT NULL, glucose TEXT NOT NULL,
+            restrictions TEXT NOT NULL, cuisine TEXT NOT NULL, foods TEXT NOT NULL, body BLOB NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS recommendations_meal ON recommendations (meal_type, id)")
+        # Inverted index: each distinct word once, and (word id, recommendation id) postings
+        self._db.execute("CREATE TABLE IF NOT EXISTS words (id INTEGER PRIMARY KEY, word TEXT NOT NULL UNIQUE)")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS postings (
+            word_id INTEGER NOT NULL, rec_id INTEGER NOT NULL, PRIMARY KEY (word_id, rec_id)) WITHOUT ROWID""")
+        self._last = self._newest()
+
+    def _newest(self):
+        row = self._db.execute(f"SELECT {_COLUMNS}, body FROM recommendations ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        return {**_entry(row[:-1]), "text": zlib.decompress(row[-1]).decode()}
+
+    def add(self, text, meal_type="", glucose=(), restrictions=(), cuisine="", foods="", created=None):
+        """Archive a response with the request it answered and return its id."""
+        created = time.time() if created is None else created
+        restrictions = [r for r in restrictions if r != "None"]
+        searchable = " ".join([text, meal_type, cuisine, foods] + restrictions)
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                rec_id = self._db.execute(
+                    "INSERT INTO recommendations (created, meal_type, glucose, restrictions, cuisine, foods, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (created, meal_type, json.dumps(list(glucose)), json.dumps(restrictions), cuisine, foods,
+                     zlib.compress(text.encode(), 6))).lastrowid
+                words = [(word,) for word in index_terms(searchable)]
+                self._db.executemany("INSERT OR IGNORE INTO words (word) VALUES (?)", words)
+                self._db.executemany("INSERT INTO postings SELECT id, ? FROM words WHERE word = ?",
+                                     [(rec_id, word) for word, in words])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._last = {"id": rec_id, "created": created, "meal_type": meal_type, "glucose": list(glucose),
+                          "restrictions": restrictions, "cuisine": cuisine, "foods": foods, "text": text}
+        return rec_id
+
+    def last(self):
+        """The newest recommendation's entry, with its ``text``, or None."""
+        return self._last
+
+    def _where(self, query, meal_type):
+        clauses, params = [], []
+        if meal_type:
+            clauses.append("meal_type = ?")
+            params.append(meal_type)
+        # Every query word must match, each as a prefix of an indexed word ("chick" finds "chicken")
+        for word in sorted({w for w in _WORD.findall((query or "").lower()) if w not in STOPWORDS}):
+            clauses.append("id IN (SELECT rec_id FROM postings WHERE word_id IN "
+                           "(SELECT id FROM words WHERE word >= ? AND word < ?))")
+            params += [word, word + "{"]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, query="", meal_type=None):
+        where, params = self._where(query, meal_type)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM recommendations{where}", params).fetchone()[0]
+
+    def search(self, query="", meal_type=None, page=0, page_size=PAGE_SIZE):
+        """Return one page of matching recommendations' metadata, newest first.
+
+        ``query`` words are ANDed; ``meal_type`` restricts to one meal. Entries
+        are dicts without the response text, which ``text()`` loads.
+        """
+        where, params = self._where(query, meal_type)
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM recommendations{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                                    params + [page_size, page * page_size]).fetchall()
+        return [_entry(row) for row in rows]
+
+    def text(self, rec_id):
+        with self._lock:
+            row = self._db.execute("SELECT body FROM recommendations WHERE id = ?", (rec_id,)).fetchone()
+        return zlib.decompress(row[0]).decode() if row else None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
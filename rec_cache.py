@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from reading_log import data_dir
+
+# Upper bounds (mg/dL, exclusive) of the glucose bands used in cache keys:
+# level 2 / level 1 hypoglycemia, fasting normal, post-meal normal, in range,
+# hyperglycemia, and severe hyperglycemia above the last bound.
+GLUCOSE_BANDS = [(54, "very-low"), (70, "low"), (100, "normal"), (140, "elevated"), (180, "high"),
+                 (250, "very-high")]
+
+
+def glucose_band(value):
+    for upper, name in GLUCOSE_BANDS:
+        if value < upper:
+            return name
+    return "severe"
+
+
+def canonical_foods(text):
+    """Lowercase, trim and de-duplicate a comma separated food list, sorted."""
+    return sorted({food.strip().lower() for food in (text or "").split(",") if food.strip()})
+
+
+def recommendation_key(meal_type, glucose, restrictions, cuisine, foods, diabetes_type="", target_range=None,
+                       patterns=None, plan=None, user=None):
+    """Return a stable cache key for a Meal Planner request.
+
+    Requests that differ only in glucose values within the same clinical
+    band, restriction order, or food list spelling/case/order share a key.
+    ``patterns`` is the coarse history summary from ``glucose_patterns.summary_key``
+    and ``plan`` the local meal plan being explained, from ``nutrition.plan_key``:
+    two readings in one band can still fall on either side of the target range.
+    The cache is shared by everyone on the host, so a response written from a
+    history summary quotes that user's readings: pass the user's key as
+    ``user`` whenever ``patterns`` is set, so it is only served back to them.
+    """
+    normalized = {
+        "meal_type": meal_type,
+        "glucose": [glucose_band(value) for value in glucose],
+        "restrictions": sorted(r for r in restrictions if r != "None"),
+        "cuisine": "" if cuisine in ("", "Any") else cuisine,
+        "foods": canonical_foods(foods),
+        "diabetes_type": diabetes_type or "",
+        "target_range": list(target_range) if target_range else None,
+        "patterns": patterns,
+        "plan": plan,
+        "user": user,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class RecommendationCache:
+    """On-disk recommendation cache with TTL and LRU size bound.
+
+    Backed by a SQLite file so every session and process on the host shares
+    it. Hit and miss counts are kept for the running process.
+    """
+
+    def __init__(self, path=None, ttl=24 * 3600, max_entries=1000):
+        self.path = path or os.path.join(data_dir(), "recommendations.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS recommendations (
+            key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS recommendations_last_used ON recommendations (last_used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM recommendations WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._db.execute("UPDATE recommendations SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM recommendations WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?)", (key, response, now, now))
+            self._db.execute("DELETE FROM recommendations WHERE created < ?", (now - self.ttl,))
+            self._db.execute("""DELETE FROM recommendations WHERE key IN (
+                SELECT key FROM recommendations ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0